@@ -5,10 +5,15 @@ Vytvoří vector embeddings pro každý chunk.
 """
 
 import json
+import sys
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 
+# Binární úložiště embeddingů sdílí formát s RAG systémem
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "5-RAG_System"))
+from embedding_store import save_store, STORE_NAME
+
 
 # Konfigurace
 EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"  # Pro češtinu/slovenštinu
@@ -17,6 +22,23 @@ BATCH_SIZE = 32  # Kolik chunků zpracovat najednou (rychlost)
 # Cesty k souborům
 INPUT_FILE = Path("/Users/atlas/Projects/Fleurdin_AI/4-RAG_Pipeline/chunked_data.json")
 OUTPUT_FILE = Path("/Users/atlas/Projects/Fleurdin_AI/4-RAG_Pipeline/chunked_data_with_embeddings.json")
+STORE_BASE = OUTPUT_FILE.with_name(STORE_NAME)  # .npy matice + .meta.json sidecar
+
+# JSON s embeddingy je potřeba jen pro fix_labels_script / upload do Supabase
+WRITE_JSON = True
+
+# Uložit navíc int8 kvantizované kódy (4x menší, pro SEARCH_BACKEND = "int8")
+WRITE_INT8 = True
+
+# Uložit navíc znaménkové bity (48 B/chunk, pro SEARCH_BACKEND = "binary")
+WRITE_BINARY = True
+
+# Uložit navíc BM25 index textu chunků (hybridní vyhledávání v RAG systému)
+WRITE_BM25 = True
+
+# Volitelná PCA projekce uložené matice (např. 128; None = plných 384 dimenzí)
+# Výběr dimenze podle reportu: python 5-RAG_System/benchmark_retrieval.py
+PCA_DIMENSIONS = None
 
 
 print("="*70)
@@ -58,7 +80,7 @@ def create_embeddings(chunks, model):
     print(f"\n✅ Hotovo! Vytvořeno {len(chunks)} embeddingů")
     print(f"📏 Velikost embeddingy: {len(embeddings[0])} dimenzí")
 
-    return chunks
+    return chunks, embeddings
 
 def main():
     """
@@ -85,7 +107,7 @@ def main():
     print("✅ Model načten!")
 
     # 3. Vytvoř embeddings
-    chunks_with_embeddings = create_embeddings(data['chunks'], model)
+    chunks_with_embeddings, embeddings = create_embeddings(data['chunks'], model)
 
     # 4. Ulož výsledky
     print("\n" + "="*70)
@@ -99,16 +121,31 @@ def main():
         "embedding_dimensions": len(chunks_with_embeddings[0]['embedding'])
     }
 
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    matrix_path, meta_path = save_store(
+        STORE_BASE,
+        chunks_with_embeddings,
+        embeddings,
+        embedding_model=EMBEDDING_MODEL,
+        stats=data['stats'],
+        quantize_int8=WRITE_INT8,
+        binary_codes=WRITE_BINARY,
+        lexical_index=WRITE_BM25,
+        pca_dimensions=PCA_DIMENSIONS
+    )
+
+    if WRITE_JSON:
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
 
     print(f"\n✅ HOTOVO!")
-    print(f"📂 Výstup: {OUTPUT_FILE}")
+    print(f"📂 Výstup: {matrix_path} + {meta_path.name}")
+    if WRITE_JSON:
+        print(f"📂 JSON: {OUTPUT_FILE}")
     print(f"\n📊 FINÁLNÍ STATISTIKY:")
     print(f"  • Celkem chunků: {len(chunks_with_embeddings)}")
     print(f"  • Embedding model: {EMBEDDING_MODEL}")
     print(f"  • Embedding dimenze: {output_data['embedding_dimensions']}")
-    print(f"  • Velikost souboru: ~{OUTPUT_FILE.stat().st_size / 1024 / 1024:.1f} MB")
+    print(f"  • Velikost matice: ~{matrix_path.stat().st_size / 1024 / 1024:.1f} MB")
     print("\n" + "="*70)
     print("\n🎯 Další krok: Nahrát data do vector databáze (Supabase/Chroma)")
 
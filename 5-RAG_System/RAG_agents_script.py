@@ -1,14 +1,20 @@
+import asyncio
 import json
+import time
+STARTUP_START = time.perf_counter()  # měření doby startu (import + zdroje)
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+from pathlib import Path
 import numpy as np
 import warnings
 from typing import Annotated
 from dotenv import load_dotenv, find_dotenv
 from typing_extensions import TypedDict
 from datetime import datetime
-from sklearn.metrics.pairwise import cosine_similarity
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langgraph.graph import StateGraph
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import START, END
 from langchain_core.prompts import ChatPromptTemplate
@@ -16,6 +22,25 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_huggingface import HuggingFaceEmbeddings
 from langgraph.graph.message import add_messages
 from visualizer import visualize
+from vector_search import VectorIndex, adaptive_cutoff, merge_top_k, mmr_select, normalize_vector, partition_rows
+from embedding_store import (STORE_NAME, binary_path, bm25_path, index_version, int8_path, ivf_path,
+                             load_store, pq_path, store_exists, store_paths)
+from ivf_index import IVFIndex
+from quantization import Int8Index
+from pq_index import PQIndex
+from binary_index import BinaryIndex
+from filter_index import BitmapFilterIndex, restrict_rows
+from query_cache import QueryEmbeddingCache
+from answer_cache import SemanticAnswerCache
+from entity_matcher import EntityMatcher
+from trigram_index import TrigramIndex
+from lexical_index import BM25Index, chunk_document, reciprocal_rank_fusion
+from reranker import CrossEncoderReranker
+from passage_stitcher import PartIndex
+from context_compressor import ContextCompressor
+from rewrite_cache import RewriteCache, is_keyword_query
+from context_formatter import CONTEXT_MAX_TOKENS, SYSTEM_PROMPT, format_context, human_prompt
+from resources import LazyResources
 
 # Potlačit pydantic warnings (ale LangSmith tracking zůstává aktivní)
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
@@ -30,115 +55,627 @@ _ = load_dotenv(find_dotenv())  # read local .env file
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     question: str  
+    tier: str      
+    entities: list 
     query: str     
     docs: list     
+    speculative_docs: list
     answer: str    
 
+# Sdílené zdroje (model, data, indexy) se vytvoří až při prvním použití -
+# import skriptu (nástroje, testy) nic nenačítá, main_loop je postaví paralelně
+resources = LazyResources()
+
 # Model
-llm = ChatOpenAI(model="gpt-4o-mini")
+resources.register("llm", lambda: ChatOpenAI(model="gpt-4o-mini"))
+
+def answer_messages(state):
+    # Do promptu jde jen název, zdroj a text chunků (bez embeddingů a metadat)
+    context = format_context(state['docs'], max_tokens=CONTEXT_MAX_TOKENS)
+    return [
+        SystemMessage(SYSTEM_PROMPT),
+        HumanMessage(human_prompt(state['question'], context)),
+    ]
 
 def AnswerNode(state: State, config: RunnableConfig):
-    messages = [
-        SystemMessage(
-            "Jsi zkušený aromaterapeut a expert na přírodní medicínu s mnohaletou praxí. "
-            "Odpovídej přátelsky, ale profesionálně - jako by ses bavil s klientem při konzultaci. "
-            "\n\n"
-            "DŮLEŽITÉ POKYNY:\n"
-            "1. Odpovídej POUZE na základě poskytnutého kontextu z databáze\n"
-            "2. Odpovídej STEJNÝM JAZYKEM jako otázka uživatele (čeština/slovenština)\n"
-            "3. Používej přirozený, vstřícný tón - ne jako databáze, ale jako expert který radí\n"
-            "4. VŽDY doporuč KOMBINACI esenciálních olejů A bylinných přípravků (čaje, tinktury, atd.)\n"
-            "5. Pro každé doporučení uveď:\n"
-            "   - Konkrétní názvy (esenciální oleje + bylinky)\n"
-            "   - Jak je používat (inhalace, masáž, difuzér, čaj, tinktura)\n"
-            "   - Případná upozornění\n"
-            "6. Struktura odpovědi:\n"
-            "   - Nejdřív esenciální oleje (pokud jsou v kontextu)\n"
-            "   - Pak bylinné alternativy/doplňky (pokud jsou v kontextu)\n"
-            "7. Nepiš to jako seznam z databáze, ale jako radu od zkušeného terapeuta"
-        ),
-        HumanMessage(
-            f"Klient se ptá: {state['question']}\n\n"
-            f"Máš k dispozici tyto informace:\n{state['docs']}\n\n"
-            f"Doporuč KOMBINACI esenciálních olejů i bylinných přípravků, pokud jsou dostupné:"
-        ),
-    ]
-    response = llm.invoke(messages)
+    response = resources.llm.invoke(answer_messages(state), config)
     return {"answer": response.content}
 
+async def AnswerNodeAsync(state: State, config: RunnableConfig):
+    # Tokeny odpovědi jdou ven přes graph.astream(stream_mode="messages")
+    response = await resources.llm.ainvoke(answer_messages(state), config)
+    return {"answer": response.content}
 
-# RAG - Načte data
-with open("chunked_data_with_embeddings.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-    chunks = data["chunks"]
 
-def search_similar_chunks(query_embedding, top_k=5):
+# RAG - Konfigurace vyhledávání
+# "exact" = přesné hledání (maticový součin),
+# "ivf" = k-means oddíly (obdoba pgvector ivfflat), "int8" = kvantizovaná matice + float přeskórování,
+# "pq" = product quantization (pár bajtů na chunk), "binary" = Hamming prefiltr + přesné přeskórování
+SEARCH_BACKEND = "exact"
+IVF_INDEX_FILE = ivf_path(STORE_NAME)  # indexy se ukládají vedle úložiště
+IVF_NPROBE = 8  # kolik oddílů prohledat (víc = vyšší recall, pomalejší)
+INT8_RESCORE = 100  # kolik kandidátů z int8 hledání přeskórovat ve float32
+PQ_INDEX_FILE = pq_path(STORE_NAME)
+PQ_SUBSPACES = 16  # bajtů na chunk (384 dim / 16 = 24 dim na subprostor)
+PQ_RESCORE = 100   # přeskórování shortlistu ve float32 (0 = čisté PQ, float matice se nečte)
+BINARY_CANDIDATES = 200  # kolik kandidátů z Hammingova prefiltru přeskórovat
+
+# Hybridní vyhledávání - BM25 nad textem chunků + dense, spojené přes RRF
+HYBRID_SEARCH = True
+RRF_K = 60             # konstanta reciprocal-rank fusion (vyšší = plošší váhy pořadí)
+FUSION_CANDIDATES = 4  # kolikrát víc kandidátů z každého seznamu před spojením
+
+# MMR - rozmanitost vybraných chunků (sousední části téhož odstavce se překrývají)
+MMR_ENABLED = True
+MMR_CANDIDATES = 4     # kolikrát víc kandidátů než top_k, ze kterých MMR vybírá
+MMR_LAMBDA = {         # váha relevance podle tieru (1.0 = bez MMR, nižší = rozmanitější)
+    None: 0.7,
+    "free": 0.7,
+    "premium": 0.6
+}
+
+# Adaptivní top_k - při jasném vítězi méně chunků (menší prompt), při plochém skóre víc
+ADAPTIVE_TOP_K = True
+ADAPTIVE_MIN_K = 2            # nejméně chunků celkem
+ADAPTIVE_MIN_PER_TYPE = 1     # nejméně chunků z olejů i z ostatních (kombinace v odpovědi)
+ADAPTIVE_SCORE_GAP = 0.08     # mezera v cosine similarity, za kterou se výsledky uříznou
+ADAPTIVE_FUSED_GAP = 0.15     # mezera ve spojeném RRF skóre (0-1) u hybridního hledání
+
+# Tier uživatele - free vidí jen free chunky, premium všechno
+USER_TIER = "premium"
+TIER_ACCESS = {
+    "free": ["free"],
+    "premium": ["free", "premium"]
+}
+
+# RAG - Načte data
+# Primárně binární úložiště (memmap, zero-copy), JSON jen jako fallback
+if store_exists(STORE_NAME):
+    chunk_source_files = store_paths(STORE_NAME)
+else:
+    chunk_source_files = [Path("chunked_data_with_embeddings.json")]
+
+def load_chunk_store():
+    return load_store(STORE_NAME) if store_exists(STORE_NAME) else None
+
+def load_chunks():
+    if resources.store is not None:
+        return resources.store.chunks
+    with open("chunked_data_with_embeddings.json", "r", encoding="utf-8") as f:
+        return json.load(f)["chunks"]
+
+def load_vector_index():
+    if resources.store is not None:
+        return VectorIndex(resources.store.matrix, normalized=True)
+    # Embeddingy jednou do normalizované float32 matice (řádek = chunk)
+    return VectorIndex.from_chunks(resources.chunks)
+
+def split_type_partitions():
     """
-    Najde top_k nejpodobnějších chunků s prioritou pro esenciální oleje.
-    Vrací 50% z olejů a 50% z ostatních zdrojů.
+    Řádky podle typu - ve store jsou seřazené podle typu, takže jde o souvislé
+    rozsahy matice a každý typ se skóruje zvlášť bez kopie.
+    Vrací (oil_partition, other_partitions).
     """
-    similarities = []
-    for chunk in chunks:
-        chunk_embedding = np.array(chunk["embedding"])
-        similarity = cosine_similarity(
-            [query_embedding],
-            [chunk_embedding]
-        )[0][0]
-        similarities.append((chunk, similarity))
-
-    # Seřadí podle similarity
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    type_partitions = partition_rows(resources.chunks, "type")
+    return (type_partitions.get('essential_oil'),
+            [rows for chunk_type, rows in type_partitions.items() if chunk_type != 'essential_oil'])
+
+resources.register("store", load_chunk_store)
+resources.register("chunks", load_chunks)
+resources.register("vector_index", load_vector_index)
+resources.register("type_partitions", split_type_partitions)
+resources.register("oil_mask", lambda: np.array(
+    [chunk.get('type') == 'essential_oil' for chunk in resources.chunks], dtype=bool))
+
+# Bitmapy metadat (tier, type, entity_type, content_type) pro filtrované hledání
+resources.register("filter_index", lambda: BitmapFilterIndex.from_chunks(resources.chunks))
+
+@lru_cache(maxsize=None)
+def partitions_for_tier(tier):
+    """
+    Vrátí (maska, oil_partition, other_partitions) omezené na chunky
+    dostupné pro daný tier - skóruje se pak jen povolená podmnožina.
+    """
+    oil_partition, other_partitions = resources.type_partitions
+    if tier is None:
+        return None, oil_partition, other_partitions
 
-    # Rozdělí na oleje a ostatní
-    oil_chunks = [(chunk, score) for chunk, score in similarities if chunk.get('type') == 'essential_oil']
-    other_chunks = [(chunk, score) for chunk, score in similarities if chunk.get('type') != 'essential_oil']
+    allowed = resources.filter_index.mask(tier=TIER_ACCESS[tier])
+    oils = restrict_rows(oil_partition, allowed) if oil_partition is not None else None
+    others = [rows for rows in (restrict_rows(p, allowed) for p in other_partitions) if rows is not None]
+    return allowed, oils, others
 
-    # Vezme top_k/2 z každé kategorie
+def load_or_build(path, load, build, message):
+    """
+    Načte index ze souboru. Chybí-li, nebo patří k jiné verzi úložiště
+    (přeuložení mění pořadí řádků), postaví ho znovu a uloží s aktuální verzí.
+    """
+    version = index_version(*chunk_source_files)
+    if path.exists():
+        try:
+            return load(path, version)
+        except ValueError as e:
+            print(f"⚠️  {e} - stavím znovu")
+    print(message)
+    index = build()
+    index.save(path, version=version)
+    return index
+
+def load_search_backend(backend):
+    """
+    Vrátí index pro přibližné vyhledávání (None = přesné hledání).
+    Index se postaví jen poprvé (a po změně úložiště), jinak se načítá ze souboru.
+    """
+    if backend == "exact":
+        return None
+
+    vector_index = resources.vector_index
+
+    if backend == "ivf":
+        return load_or_build(IVF_INDEX_FILE,
+                             lambda path, version: IVFIndex.load(path, vector_index.matrix, nprobe=IVF_NPROBE,
+                                                                 version=version),
+                             lambda: IVFIndex.build(vector_index.matrix, nprobe=IVF_NPROBE),
+                             "⏳ Stavím IVF index (jen poprvé)...")
+
+    if backend == "int8":
+        if int8_path(STORE_NAME).exists():
+            return Int8Index.load(int8_path(STORE_NAME), vector_index.matrix, rescore=INT8_RESCORE)
+        return Int8Index.build(vector_index.matrix, rescore=INT8_RESCORE)
+
+    if backend == "pq":
+        return load_or_build(PQ_INDEX_FILE,
+                             lambda path, version: PQIndex.load(path, vector_index.matrix, rescore=PQ_RESCORE,
+                                                                version=version),
+                             lambda: PQIndex.build(vector_index.matrix, m=PQ_SUBSPACES,
+                                                   matrix_for_rescore=vector_index.matrix, rescore=PQ_RESCORE),
+                             "⏳ Trénuji PQ codebooky (jen poprvé)...")
+
+    if backend == "binary":
+        if binary_path(STORE_NAME).exists():
+            return BinaryIndex.load(binary_path(STORE_NAME), vector_index.matrix, candidates=BINARY_CANDIDATES)
+        return BinaryIndex.build(vector_index.matrix, candidates=BINARY_CANDIDATES)
+
+    raise ValueError(f"Neznámý SEARCH_BACKEND: {backend}")
+
+def load_lexical_index():
+    """BM25 index - ze souboru vedle úložiště, jinak se postaví z chunků (pár desítek ms)."""
+    if resources.store is not None and bm25_path(STORE_NAME).exists():
+        try:
+            return BM25Index.load(bm25_path(STORE_NAME), count=len(resources.store))
+        except ValueError as e:
+            print(f"⚠️  {e} - stavím BM25 z chunků")
+    return BM25Index.from_texts(chunk_document(chunk) for chunk in resources.chunks)
+
+resources.register("search_backend", lambda: load_search_backend(SEARCH_BACKEND))
+resources.register("lexical_index", load_lexical_index)
+
+def ranked_rows_by_type(query_embedding, top_k, tier=None):
+    """
+    Vrátí (oil_rows, other_rows) - až top_k nejlepších řádků z každé kategorie.
+    """
+    _, oils, others = partitions_for_tier(tier)
+    vector_index = resources.vector_index
+    search_backend = resources.search_backend
+
+    # Oleje jsou ~1 % chunků - přesné hledání v malém oddílu je levné a kvóta
+    # olejů se tak nezhroutí (v globálním přibližném shortlistu skoro nejsou)
+    oil_rows = np.empty(0, dtype=np.int64)
+    if oils is not None:
+        oil_rows, _ = vector_index.search(query_embedding, top_k, rows=oils)
+
+    # Každý oddíl má vlastní částečný top-k, ostatní typy se jen sloučí.
+    # Přibližný backend skóruje jen řádky oddílu povolené pro tier.
+    search = vector_index.search if search_backend is None else search_backend.search
+    other_rows, _ = merge_top_k(
+        [search(query_embedding, top_k, rows=rows) for rows in others],
+        top_k
+    )
+    return oil_rows, other_rows
+
+def take_with_quota(oils, others, top_k):
+    """
+    Vezme top_k/2 z olejů a top_k/2 z ostatních (obojí seřazené od nejlepšího).
+    Pokud jedna kategorie nemá dost položek, doplní z druhé.
+    """
     half = top_k // 2
-    selected_oils = oil_chunks[:half]
-    selected_others = other_chunks[:half]
+    selected_oils = oils[:half]
+    selected_others = others[:half]
 
-    # Pokud jedna kategorie nemá dost chunků, doplní z druhé
     if len(selected_oils) < half:
         needed = half - len(selected_oils)
-        selected_others = other_chunks[:half + needed]
+        selected_others = others[:half + needed]
     elif len(selected_others) < half:
         needed = half - len(selected_others)
-        selected_oils = oil_chunks[:half + needed]
+        selected_oils = oils[:half + needed]
 
-    # Spojí a vrátí jen chunky (bez score)
-    result = selected_oils + selected_others
-    return [chunk for chunk, score in result]
+    return list(selected_oils) + list(selected_others)
 
-# RAG - Seřadí data pro embedding query
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+def fuse_lexical(oil_rows, other_rows, query_text, pool, tier=None):
+    """
+    Spojí dense pořadí s BM25 pořadím (RRF) zvlášť pro oleje a ostatní zdroje.
+    Vrací ((oil_rows, oil_relevance), (other_rows, other_relevance)) - až pool
+    nejlepších řádků z každé kategorie a jejich RRF skóre normalizované na 0-1.
+    """
+    allowed = partitions_for_tier(tier)[0]
+    lexical_rows, _ = resources.lexical_index.search(query_text, pool, mask=allowed)
+    oil_mask = resources.oil_mask
+    lexical_oils = lexical_rows[oil_mask[lexical_rows]]
+    lexical_others = lexical_rows[~oil_mask[lexical_rows]]
+    fused = []
+    for dense, lexical in ((oil_rows, lexical_oils), (other_rows, lexical_others)):
+        rows, scores = reciprocal_rank_fusion([dense, lexical], k=RRF_K, return_scores=True)
+        fused.append((rows[:pool], scores[:pool] / scores[0] if len(scores) else scores))
+    return tuple(fused)
+
+def diversify_with_quota(query_embedding, oil_rows, other_rows, top_k, lambda_, relevance=None):
+    """
+    MMR výběr z kandidátů obou kategorií najednou pod kvótou oleje/ostatní
+    (stejné doplňování jako take_with_quota). Vrací řádky - oleje, pak ostatní.
+    relevance = relevance kandidátů (oleje, pak ostatní) místo cosine s dotazem -
+    u hybridního hledání RRF skóre, aby BM25 zásahy neprohrály s dense sousedy.
+    """
+    rows = np.concatenate([oil_rows, other_rows]).astype(np.int64)
+    groups = np.repeat([0, 1], [len(oil_rows), len(other_rows)])
+    half = top_k // 2
+    quota = np.array([half + max(0, half - len(other_rows)), half + max(0, half - len(oil_rows))])
 
-def GetDataFromDBNode(state: State, config: RunnableConfig):
-      # Vytvoří embedding z query
-      query_embedding = embeddings.embed_query(state["query"])
+    candidates = np.asarray(resources.vector_index.matrix[rows])
+    selected = mmr_select(normalize_vector(query_embedding), candidates, 2 * half,
+                          lambda_=lambda_, groups=groups, quota=quota, relevance=relevance)
+    picked, picked_groups = rows[selected], groups[selected]
+    return list(picked[picked_groups == 0]) + list(picked[picked_groups == 1])
 
-      # Najde podobné chunky (6 = 3 oleje + 3 ostatní)
-      relevant_docs = search_similar_chunks(query_embedding, top_k=6)
+def trim_by_score_gap(rows, scores, min_gap):
+    """
+    Adaptivní top_k - ořízne vybrané řádky (oleje, pak ostatní) za první
+    výraznou mezerou ve skóre. Z každé kategorie zůstane aspoň
+    ADAPTIVE_MIN_PER_TYPE prvních (pořadí výběru MMR), pořadí se nemění.
+
+    Parametry:
+    - scores: relevance vybraných řádků, podle které se vybíralo (u hybridního
+      hledání spojené RRF skóre - dense cosine by odřízla čistě BM25 zásahy)
+    - min_gap: mezera ve skóre, za kterou se výsledky uříznou
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float32)
+    if len(rows) <= ADAPTIVE_MIN_K:
+        return list(rows)
 
-      return {"docs": relevant_docs}
+    k = adaptive_cutoff(scores, ADAPTIVE_MIN_K, len(rows), min_gap)
+    keep = scores >= np.sort(scores)[::-1][k - 1]
 
+    for is_oil in (True, False):
+        category = np.flatnonzero(resources.oil_mask[rows] == is_oil)
+        keep[category[:ADAPTIVE_MIN_PER_TYPE]] = True
+    return list(rows[keep])
 
-#Prepare query node (Chain) ----------
-def PrepareQueryNode(state: State, config: RunnableConfig):
-    messages = [
-        (
-            "system",
-            "Improve the user query, so it can be used for a query in vector DB.",
-        ),
-        ("human", "User question: {question}"),
-    ]
-    prompt = ChatPromptTemplate.from_messages(messages)
+def search_similar_chunks(query_embedding, top_k=5, tier=None, query_text=None, adaptive=False):
+    """
+    Najde top_k nejpodobnějších chunků s prioritou pro esenciální oleje.
+    Vrací 50% z olejů a 50% z ostatních zdrojů.
+    tier omezí hledání na chunky dostupné pro daný tier (None = bez filtru).
+    query_text zapne hybridní hledání (BM25 + dense přes RRF).
+    adaptive vrátí méně chunků (až ADAPTIVE_MIN_K), pokud skóre ukazují jasného vítěze.
+    """
+    hybrid = HYBRID_SEARCH and query_text
+
+    # Z každé kategorie stačí top_k nejlepších (víc se ani při doplnění nepoužije),
+    # hybridní hledání a MMR vybírají ze širšího okruhu kandidátů
+    pool = top_k * max(FUSION_CANDIDATES if hybrid else 1, MMR_CANDIDATES if MMR_ENABLED else 1)
+    oil_rows, other_rows = ranked_rows_by_type(query_embedding, pool, tier)
+    relevance = None
+    if hybrid:
+        (oil_rows, oil_relevance), (other_rows, other_relevance) = fuse_lexical(
+            oil_rows, other_rows, query_text, pool, tier)
+        # MMR pak řadí podle spojeného pořadí, ne jen podle dense cosine
+        relevance = np.concatenate([oil_relevance, other_relevance])
+
+    if MMR_ENABLED:
+        result = diversify_with_quota(query_embedding, oil_rows, other_rows, top_k,
+                                      MMR_LAMBDA.get(tier, MMR_LAMBDA[None]), relevance)
+    else:
+        result = take_with_quota(oil_rows, other_rows, top_k)
+
+    if adaptive:
+        if relevance is None:
+            scores = np.asarray(resources.vector_index.matrix[result]) @ normalize_vector(query_embedding)
+            result = trim_by_score_gap(result, scores, ADAPTIVE_SCORE_GAP)
+        else:
+            fused = dict(zip(np.concatenate([oil_rows, other_rows]).tolist(), relevance))
+            result = trim_by_score_gap(result, [fused[row] for row in result], ADAPTIVE_FUSED_GAP)
+
+    # Vrátí jen chunky (bez score)
+    return [resources.chunks[row] for row in result]
 
-    chain = prompt | llm | StrOutputParser()
+# RAG - Seřadí data pro embedding query
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+resources.register("embeddings", lambda: HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL))
+
+# Cache embeddingů dotazů (LRU + TTL), ukládá se mezi spuštěními
+QUERY_CACHE_FILE = "query_embedding_cache.npz"
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = 7 * 24 * 3600  # 7 dní
+query_cache = QueryEmbeddingCache(EMBEDDING_MODEL, maxsize=QUERY_CACHE_SIZE,
+                                  ttl=QUERY_CACHE_TTL, path=QUERY_CACHE_FILE)
+
+def embed_query(text):
+    """Embedding dotazu v prostoru uložené matice (případná PCA projekce)."""
+    query_embedding = query_cache.get_or_compute(text, resources.embeddings.embed_query)
+    if resources.store is not None:
+        return resources.store.project_query(query_embedding)
+    return query_embedding
+
+# Rychlá cesta - otázka jmenuje konkrétní olej/bylinku (Aho-Corasick nad názvy)
+ENTITY_FAST_PATH = True
+ENTITY_MAX_CHUNKS = 3  # kolik chunků zmíněných entit dát do kontextu
+resources.register("entity_matcher", lambda: EntityMatcher.from_chunks(resources.chunks))
+
+# Fuzzy varianta - překlepy a skloňované tvary ("levanduli", "pupava") přes trigramy
+ENTITY_FUZZY = True
+ENTITY_FUZZY_THRESHOLD = 0.6  # min. Jaccard podobnost trigramů zmínky a názvu
+resources.register("fuzzy_entity_index", lambda: TrigramIndex.from_chunks(resources.chunks))
+
+def match_entities(question):
+    """Entity zmíněné v otázce - nejdřív přesné názvy, pak fuzzy shoda."""
+    entities = resources.entity_matcher.match(question)
+    if not entities and ENTITY_FUZZY:
+        entities = resources.fuzzy_entity_index.match(question, threshold=ENTITY_FUZZY_THRESHOLD)
+    return entities
+
+def search_entity_chunks(query_embedding, entities, top_k, tier=None):
+    """Nejrelevantnější chunky zmíněných entit (jen povolené pro tier)."""
+    rows = resources.entity_matcher.rows_for(entities)
+    allowed = partitions_for_tier(tier)[0]
+    if allowed is not None:
+        rows = rows[allowed[rows]]
+    if len(rows) == 0:
+        return []
+
+    best, _ = resources.vector_index.search(query_embedding, top_k, rows=rows)
+    return [resources.chunks[row] for row in best]
+
+# Části stejného textu (<parent>_part_N) se spojí do souvislých pasáží bez překryvu
+STITCH_PASSAGES = True
+resources.register("part_index", lambda: PartIndex.from_chunks(resources.chunks))
+
+def stitch_passages(docs):
+    """Sousední části slije, useknuté věty doplní ze sousední části."""
+    return resources.part_index.stitch(docs) if STITCH_PASSAGES else docs
+
+# Volitelný reranking cross-encoderem mezi vyhledáváním a odpovědí
+RERANK_ENABLED = False
+RERANK_CANDIDATES = 30     # kolik kandidátů z vyhledávání přeskórovat
+RERANK_TOP_K = 6           # kolik chunků jde do odpovědi
+RERANK_TIME_BUDGET = 0.5   # s - po vypršení se použije pořadí z vyhledávání
+
+def load_reranker():
+    # Model se načítá na pozadí - první dotazy do jeho načtení spadnou na pořadí z vyhledávání
+    reranker = CrossEncoderReranker()
+    reranker.warmup()
+    return reranker
+
+resources.register("reranker", load_reranker)
+
+def retrieve_docs(query, question, entities, tier):
+    """
+    Chunky pro dotaz - nejdřív zmíněné entity, vektorové (hybridní) hledání doplní zbytek.
+    query = text pro embedding (přepsaný dotaz nebo přímo otázka).
+    """
+    # Vytvoří embedding z query
+    query_embedding = embed_query(query)
+    top_k = RERANK_CANDIDATES if RERANK_ENABLED else 6
+
+    # Zmíněné entity jdou rovnou do kontextu, vektorové hledání jen doplní zbytek
+    relevant_docs = []
+    if entities:
+        relevant_docs = search_entity_chunks(query_embedding, entities, ENTITY_MAX_CHUNKS, tier)
+
+    # Najde podobné chunky (6 = 3 oleje + 3 ostatní)
+    remaining = top_k - len(relevant_docs)
+    if remaining > 0:
+        seen_ids = {doc["id"] for doc in relevant_docs}
+        # BM25 dostane i původní otázku - přesné (slovenské) názvy z ní přepis může vypustit
+        query_text = question if query == question else f"{question}\n{query}"
+        # Reranking potřebuje všechny kandidáty, adaptivní ořez až po něm nedává smysl
+        similar = search_similar_chunks(query_embedding, top_k=remaining, tier=tier, query_text=query_text,
+                                        adaptive=ADAPTIVE_TOP_K and not RERANK_ENABLED)
+        relevant_docs += [doc for doc in similar if doc["id"] not in seen_ids]
+
+    return relevant_docs
+
+def merge_retrieved(primary, speculative):
+    """
+    Spojí výsledek pro přepsaný dotaz se spekulativním výsledkem pro otázku (RRF podle id).
+    Počet olejů a ostatních chunků zůstane stejný jako v primárním výsledku.
+    """
+    scores = {}
+    docs_by_id = {}
+    for docs in (primary, speculative):
+        for rank, doc in enumerate(docs):
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs_by_id.setdefault(doc["id"], doc)
+
+    ranked = [docs_by_id[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)]
+    oils = [doc for doc in ranked if doc.get("type") == "essential_oil"]
+    others = [doc for doc in ranked if doc.get("type") != "essential_oil"]
+    oil_count = sum(doc.get("type") == "essential_oil" for doc in primary)
+    return oils[:oil_count] + others[:len(primary) - oil_count]
+
+def SpeculativeRetrieveNode(state: State, config: RunnableConfig):
+    """Hledá rovnou podle otázky, zatímco PrepareQuery čeká na přepis od LLM."""
+    entities = match_entities(state["question"]) if ENTITY_FAST_PATH else []
+    tier = state.get("tier", USER_TIER)
+    return {"speculative_docs": retrieve_docs(state["question"], state["question"], entities, tier)}
 
-    result = chain.invoke({"question": state["question"]})
+def GetDataFromDBNode(state: State, config: RunnableConfig):
+      tier = state.get("tier", USER_TIER)
+      speculative = state.get("speculative_docs")
+
+      if speculative is not None and state["query"] == state["question"]:
+          # Dotaz se nepřepisoval (entita, timeout přepisu) - spekulativní výsledek je přesně ono
+          relevant_docs = speculative
+      else:
+          relevant_docs = retrieve_docs(state["query"], state["question"], state.get("entities"), tier)
+          if speculative:
+              relevant_docs = merge_retrieved(relevant_docs, speculative)
+
+      # S rerankingem se pasáže skládají až z vybraných chunků
+      if RERANK_ENABLED:
+          return {"docs": relevant_docs}
+      return {"docs": stitch_passages(relevant_docs)}
+
+def RerankNode(state: State, config: RunnableConfig):
+    """Přeskóruje kandidáty cross-encoderem a nechá RERANK_TOP_K nejlepších (kvóta olejů platí dál)."""
+    docs = state["docs"]
+    if len(docs) <= RERANK_TOP_K:
+        return {"docs": docs}
+
+    reranked = resources.reranker.rerank(state["question"], docs, time_budget=RERANK_TIME_BUDGET)
+    if reranked is None:
+        print(f"⏱️  Reranking nestihl limit {RERANK_TIME_BUDGET * 1000:.0f} ms (nebo byl přeskočen) - pořadí z vyhledávání")
+    else:
+        docs = reranked[0]
+
+    oils = [doc for doc in docs if doc.get("type") == "essential_oil"]
+    others = [doc for doc in docs if doc.get("type") != "essential_oil"]
+    return {"docs": stitch_passages(take_with_quota(oils, others, RERANK_TOP_K))}
+
+
+# Extraktivní komprese - z chunků jen nejrelevantnější věty do limitu tokenů
+COMPRESS_CONTEXT = True
+CONTEXT_TOKEN_BUDGET = 1200   # tokenů textu všech chunků dohromady
+context_compressor = ContextCompressor(lambda texts: resources.embeddings.embed_documents(texts),
+                                       token_budget=CONTEXT_TOKEN_BUDGET)
+
+def CompressContextNode(state: State, config: RunnableConfig):
+    """Zkrátí chunky na věty relevantní k otázce (zdroj každé věty zůstává)."""
+    question_embedding = query_cache.get_or_compute(state["question"], resources.embeddings.embed_query)
+    return {"docs": context_compressor.compress(question_embedding, state["docs"])}
 
-    return {"query": result}
+
+#Prepare query node (Chain) ----------
+REWRITE_TIMEOUT = 3.0  # s - po vypršení se použije původní otázka
+SPECULATIVE_RETRIEVAL = True  # hledat podle otázky už během přepisu (přepis mimo kritickou cestu)
+REWRITE_GRACE = None   # s - se spekulativním hledáním se na přepis čeká jen takto dlouho,
+                       # pozdní přepis jde do cache; None = percentil změřené latence přepisu
+REWRITE_GRACE_PERCENTILE = 50  # p50 → spojení s přepsaným dotazem u ~poloviny přepisů
+REWRITE_GRACE_DEFAULT = 1.2    # s - dokud není latence přepisu změřená (gpt-4o-mini ~1 s)
+REWRITE_BYPASS = True  # krátké dotazy z klíčových slov se nepřepisují
+REWRITE_CACHE_FILE = "rewrite_cache.json"
+REWRITE_CACHE_SIZE = 2048
+rewrite_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rewrite")
+rewrite_cache = RewriteCache(maxsize=REWRITE_CACHE_SIZE, path=REWRITE_CACHE_FILE)
+
+# Prompt a chain se sestaví jednou, ne při každém dotazu
+rewrite_prompt = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "Improve the user query, so it can be used for a query in vector DB.",
+    ),
+    ("human", "User question: {question}"),
+])
+resources.register("rewrite_chain", lambda: rewrite_prompt | resources.llm | StrOutputParser())
+
+def prepare_without_llm(question):
+    """Vrátí výsledek PrepareQuery bez volání LLM, nebo None (přepis je potřeba)."""
+    # Otázka jmenuje konkrétní entitu - přepis přes LLM není potřeba
+    if ENTITY_FAST_PATH:
+        entities = match_entities(question)
+        if entities:
+            return {"query": question, "entities": entities}
+
+    # Pár klíčových slov se hledá dobře i bez přepisu
+    if REWRITE_BYPASS and is_keyword_query(question):
+        return {"query": question, "entities": []}
+
+    cached = rewrite_cache.get(question)
+    if cached is not None:
+        return {"query": cached, "entities": []}
+    return None
+
+# Kolikrát se místo čekání na přepis použil spekulativní výsledek a kolik to ušetřilo
+speculative_stats = {"served": 0, "merged": 0, "late_rewrites": 0, "saved_ms": 0.0}
+speculative_stats_lock = threading.Lock()
+
+def rewrite_grace():
+    """
+    Čekání na přepis se spekulativním hledáním. Pevná hodnota pod typickou
+    latencí přepisu by spojení s přepsaným dotazem tiše vypnula - výchozí
+    je proto percentil latencí uložených v cache přepisů.
+    """
+    if REWRITE_GRACE is not None:
+        return REWRITE_GRACE
+    measured_ms = rewrite_cache.latency_percentile(REWRITE_GRACE_PERCENTILE)
+    grace = REWRITE_GRACE_DEFAULT if measured_ms is None else measured_ms / 1000
+    return min(grace, REWRITE_TIMEOUT)
+
+def rewrite_deadline():
+    return rewrite_grace() if SPECULATIVE_RETRIEVAL else REWRITE_TIMEOUT
+
+def rewrite_missed(question):
+    if SPECULATIVE_RETRIEVAL:
+        with speculative_stats_lock:
+            speculative_stats["served"] += 1
+    else:
+        print(f"⏱️  Přepis dotazu nestihl {REWRITE_TIMEOUT:.1f} s - hledá se podle otázky")
+    return {"query": question, "entities": []}
+
+def store_rewrite(question, start, result):
+    """Uloží přepis včas (spojí se se spekulativním výsledkem) do cache."""
+    rewrite_cache.put(question, result, latency_ms=(time.perf_counter() - start) * 1000)
+    if SPECULATIVE_RETRIEVAL:
+        with speculative_stats_lock:
+            speculative_stats["merged"] += 1
+    return {"query": result, "entities": []}
+
+def store_late_rewrite(question, start, deadline, future):
+    """Přepis, který nestihl limit, doběhne na pozadí - uloží se do cache pro příště."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    latency_ms = (time.perf_counter() - start) * 1000
+    rewrite_cache.put(question, future.result(), latency_ms=latency_ms)
+    if SPECULATIVE_RETRIEVAL:
+        # Bez limitu by odpověď čekala celý přepis, takhle jen do deadline
+        with speculative_stats_lock:
+            speculative_stats["late_rewrites"] += 1
+            speculative_stats["saved_ms"] += latency_ms - deadline * 1000
+
+def PrepareQueryNode(state: State, config: RunnableConfig):
+    question = state["question"]
+    prepared = prepare_without_llm(question)
+    if prepared is not None:
+        return prepared
+
+    # Přepis má časový limit - při vypršení se hledá podle původní otázky
+    # (se spekulativním hledáním krátký, výsledek pro otázku už je hotový)
+    start = time.perf_counter()
+    deadline = rewrite_deadline()
+    future = rewrite_executor.submit(resources.rewrite_chain.invoke, {"question": question}, config)
+    try:
+        result = future.result(timeout=deadline)
+    except TimeoutError:
+        future.add_done_callback(lambda done: store_late_rewrite(question, start, deadline, done))
+        return rewrite_missed(question)
+
+    return store_rewrite(question, start, result)
+
+async def PrepareQueryNodeAsync(state: State, config: RunnableConfig):
+    question = state["question"]
+    prepared = prepare_without_llm(question)
+    if prepared is not None:
+        return prepared
+
+    start = time.perf_counter()
+    deadline = rewrite_deadline()
+    # asyncio.wait přepis po limitu nezruší (na rozdíl od wait_for) - doběhne do cache
+    task = asyncio.ensure_future(resources.rewrite_chain.ainvoke({"question": question}, config))
+    done, _ = await asyncio.wait({task}, timeout=deadline)
+    if not done:
+        task.add_done_callback(lambda finished: store_late_rewrite(question, start, deadline, finished))
+        return rewrite_missed(question)
+
+    return store_rewrite(question, start, task.result())
 
 def save_conversation(log):
     # Vytvoř název souboru s dnešním datem
@@ -159,40 +696,142 @@ def save_conversation(log):
 
 
 # Build the graph
+# Uzly s voláním LLM mají i async variantu (graph.ainvoke / astream),
+# ostatní uzly v async režimu běží v thread poolu
 builder = StateGraph(State)
-builder.add_node("Prepare_query", PrepareQueryNode)
-builder.add_node("AnswerNode", AnswerNode)
+builder.add_node("Prepare_query", RunnableLambda(PrepareQueryNode, afunc=PrepareQueryNodeAsync))
+builder.add_node("AnswerNode", RunnableLambda(AnswerNode, afunc=AnswerNodeAsync))
 builder.add_node("GetDataFromDBNode", GetDataFromDBNode)
 
+# Spekulativní větev běží souběžně s přepisem dotazu, GetDataFromDB počká na obě
 builder.add_edge(START, "Prepare_query")
-builder.add_edge("Prepare_query", "GetDataFromDBNode")
-builder.add_edge("GetDataFromDBNode", "AnswerNode")
+if SPECULATIVE_RETRIEVAL:
+    builder.add_node("SpeculativeRetrieveNode", SpeculativeRetrieveNode)
+    builder.add_edge(START, "SpeculativeRetrieveNode")
+    builder.add_edge(["Prepare_query", "SpeculativeRetrieveNode"], "GetDataFromDBNode")
+else:
+    builder.add_edge("Prepare_query", "GetDataFromDBNode")
+
+# Volitelné kroky mezi vyhledáváním a odpovědí
+stages = ["GetDataFromDBNode"]
+if RERANK_ENABLED:
+    builder.add_node("RerankNode", RerankNode)
+    stages.append("RerankNode")
+if COMPRESS_CONTEXT:
+    builder.add_node("CompressContextNode", CompressContextNode)
+    stages.append("CompressContextNode")
+stages.append("AnswerNode")
+for source, target in zip(stages, stages[1:]):
+    builder.add_edge(source, target)
 builder.add_edge("AnswerNode", END)
 
 # Graph object
 graph = builder.compile()
 
-# Visualize the graph
-visualize(graph, "graph.png")
+# Sémantická cache odpovědí před grafem (per tier, LRU + TTL)
+ANSWER_CACHE_THRESHOLD = 0.95  # min. similarity otázek pro použití uložené odpovědi
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 24 * 3600   # 1 den
+resources.register("answer_cache", lambda: SemanticAnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD, maxsize=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL, index_version=index_version(*chunk_source_files)))
+
+def answer_question(question, tier=USER_TIER):
+    """
+    Odpoví na otázku - nejdřív sémantická cache, při miss celý graf.
+    """
+    # Nová data = staré odpovědi neplatí
+    answer_cache = resources.answer_cache
+    answer_cache.validate(index_version(*chunk_source_files))
+
+    question_embedding = query_cache.get_or_compute(question, resources.embeddings.embed_query)
+    cached = answer_cache.lookup(question_embedding, tier)
+    if cached is not None:
+        answer, similarity, cached_question = cached
+        print(f"⚡ Odpověď z cache (similarity {similarity:.2f} s \"{cached_question}\")")
+        return answer
+
+    # Spusť graph
+    result = graph.invoke({"question": question, "tier": tier})
+
+    answer_cache.store(question_embedding, tier, question, result["answer"])
+    return result["answer"]
+
+async def answer_question_async(question, tier=USER_TIER, on_token=None):
+    """
+    Async varianta answer_question - neblokuje event loop, takže jeden proces
+    obslouží víc souběžných sezení. Tokeny odpovědi posílá do on_token(text),
+    jak přicházejí od LLM.
+    """
+    answer_cache = resources.answer_cache
+    answer_cache.validate(index_version(*chunk_source_files))
+
+    question_embedding = await asyncio.to_thread(query_cache.get_or_compute, question, resources.embeddings.embed_query)
+    cached = answer_cache.lookup(question_embedding, tier)
+    if cached is not None:
+        answer, similarity, cached_question = cached
+        print(f"⚡ Odpověď z cache (similarity {similarity:.2f} s \"{cached_question}\")")
+        if on_token:
+            on_token(answer)
+        return answer
+
+    answer = ""
+    async for mode, payload in graph.astream({"question": question, "tier": tier},
+                                             stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            # Streamují se jen tokeny odpovědi, ne přepis dotazu
+            chunk, metadata = payload
+            if on_token and chunk.content and metadata.get("langgraph_node") == "AnswerNode":
+                on_token(chunk.content)
+        elif "AnswerNode" in payload:
+            answer = payload["AnswerNode"]["answer"]
+
+    answer_cache.store(question_embedding, tier, question, answer)
+    return answer
+
+async def answer_many(questions, tier=USER_TIER):
+    """Odpoví na víc otázek (sezení) souběžně v jednom procesu."""
+    return await asyncio.gather(*(answer_question_async(question, tier) for question in questions))
+
+# Start konverzace - zdroje se postaví paralelně, obrázek grafu na pozadí
+GRAPH_IMAGE = "graph.png"
+STARTUP_RESOURCES = ["llm", "rewrite_chain", "embeddings", "vector_index", "search_backend", "lexical_index",
+                     "type_partitions", "oil_mask", "filter_index", "entity_matcher", "fuzzy_entity_index",
+                     "part_index", "answer_cache"]
+
+def warm_up():
+    """Připraví zdroje pro konverzaci a vypíše, kolik co při startu trvalo."""
+    # Vykreslení grafu jde přes síť - nečeká se na něj (a překreslí se jen při změně grafu)
+    threading.Thread(target=visualize, args=(graph, GRAPH_IMAGE), daemon=True).start()
+
+    names = STARTUP_RESOURCES + (["reranker"] if RERANK_ENABLED else [])
+    total = resources.warmup(names)
+
+    print(f"🚀 Start: import {IMPORT_TIME:.2f} s, zdroje {total:.2f} s (paralelně)")
+    for name, seconds in sorted(resources.timings.items(), key=lambda item: -item[1]):
+        print(f"  • {name:20s} {seconds * 1000:8.0f} ms")
+    print()
 
 # Hlavní konverzační loop
-def main_loop():
+async def main_loop_async():
     print("=== Aromatherapy AI Assistant ===")
     print("(Zadej 'konec' pro ukončení)\n")
 
+    await asyncio.to_thread(warm_up)
+
     conversation_log = []
 
     while True:
-        question = input("Vaše otázka: ").strip()
+        question = (await asyncio.to_thread(input, "Vaše otázka: ")).strip()
 
         if question.lower() in ['konec', 'exit', 'quit']:
             break
 
-        # Spusť graph
-        result = graph.invoke({"question": question})
-
-        answer = result["answer"]
-        print(f"\nOdpověď: {answer}\n")
+        # Odpověď se vypisuje průběžně, jak přicházejí tokeny
+        print("\nOdpověď: ", end="", flush=True)
+        answer = await answer_question_async(question, USER_TIER,
+                                             on_token=lambda token: print(token, end="", flush=True))
+        print("\n")
 
         # Zaloguj
         conversation_log.append({
@@ -204,12 +843,26 @@ def main_loop():
     # Ulož konverzaci
     save_conversation(conversation_log)
 
-if __name__ == "__main__":
-    main_loop()
-
-
-    
-
+    # Ulož cache embeddingů a přepisů pro příští spuštění
+    query_cache.save()
+    rewrite_cache.save()
+    cache_stats = query_cache.stats()
+    print(f"🧠 Cache embeddingů: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+          f"({cache_stats['hit_rate']:.0%}), uloženo {cache_stats['size']} dotazů")
+    rewrite_stats = rewrite_cache.stats()
+    print(f"✏️  Cache přepisů: {rewrite_stats['hits']} hit / {rewrite_stats['misses']} miss, "
+          f"uloženo {rewrite_stats['size']} přepisů")
+    if speculative_stats["served"] or speculative_stats["merged"]:
+        late = max(speculative_stats["late_rewrites"], 1)
+        print(f"🏎️  Přepis stihl limit {rewrite_grace():.2f} s (spojeno s přepsaným dotazem): "
+              f"{speculative_stats['merged']}×, spekulativní výsledek místo čekání: "
+              f"{speculative_stats['served']}×, ušetřeno průměrně {speculative_stats['saved_ms'] / late:.0f} ms")
 
+def main_loop():
+    asyncio.run(main_loop_async())
 
+# Import skriptu jen definuje graf a zaregistruje zdroje - nic těžkého se nenačítá
+IMPORT_TIME = time.perf_counter() - STARTUP_START
 
+if __name__ == "__main__":
+    main_loop()
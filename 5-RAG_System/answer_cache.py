@@ -0,0 +1,99 @@
+"""
+FLEURDIN AI - SEMANTIC ANSWER CACHE
+===================================
+Cache odpovědí před celým grafem (PrepareQuery → GetDataFromDB → Answer).
+
+Otázka se porovná s dříve zodpovězenými otázkami stejného tieru - pokud
+je similarity nad prahem, vrátí se uložená odpověď bez volání LLM.
+Záznamy mají LRU + TTL eviction a celá cache se zneplatní při změně
+verze indexu chunků.
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from vector_search import normalize_vector
+
+
+class SemanticAnswerCache:
+    """Cache odpovědí podle similarity embeddingu otázky"""
+
+    def __init__(self, threshold=0.95, maxsize=256, ttl=None, index_version=None):
+        """
+        Parametry:
+        - threshold: minimální cosine similarity otázky pro cache hit
+        - maxsize: max. počet uložených odpovědí (nejdéle nepoužité se vyhodí)
+        - ttl: platnost odpovědi v sekundách (None = bez expirace)
+        - index_version: verze indexu chunků, pro kterou odpovědi platí
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.index_version = index_version
+
+        self.entries = OrderedDict()    # id -> záznam (dict)
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, index_version):
+        """Zahodí všechny odpovědi, pokud se změnila verze indexu chunků."""
+        if index_version != self.index_version:
+            self.entries.clear()
+            self.index_version = index_version
+
+    def _evict_expired(self):
+        if self.ttl is None:
+            return
+        now = time.time()
+        expired = [entry_id for entry_id, entry in self.entries.items() if now - entry["created"] > self.ttl]
+        for entry_id in expired:
+            del self.entries[entry_id]
+
+    def lookup(self, question_embedding, tier):
+        """
+        Najde nejpodobnější uloženou otázku stejného tieru.
+        Vrací (odpověď, similarity, původní otázka) nebo None.
+        """
+        self._evict_expired()
+
+        candidates = [(entry_id, entry) for entry_id, entry in self.entries.items() if entry["tier"] == tier]
+        if not candidates:
+            self.misses += 1
+            return None
+
+        query = normalize_vector(question_embedding)
+        similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ query
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        entry_id, entry = candidates[best]
+        self.entries.move_to_end(entry_id)
+        self.hits += 1
+        return entry["answer"], float(similarities[best]), entry["question"]
+
+    def store(self, question_embedding, tier, question, answer):
+        self.entries[self.next_id] = {
+            "embedding": normalize_vector(question_embedding),
+            "tier": tier,
+            "question": question,
+            "answer": answer,
+            "created": time.time()
+        }
+        self.next_id += 1
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,135 @@
+"""
+FLEURDIN AI - BENCHMARK RERANKINGU
+==================================
+Kolik latence přidá cross-encoder a kolik přesnosti přinese
+na testovacích otázkách (3-Fine_tuning/test_questions.txt).
+
+Měří:
+- latenci rerankingu RERANK_CANDIDATES kandidátů (p50 / p95 v ms)
+- precision@k dense pořadí vs. po rerankingu
+
+Precision potřebuje ruční hodnocení v rerank_judgments.json
+({otázka: {"relevant": [id chunků], "candidates": [...]}}). Pokud soubor
+chybí, vytvoří se šablona s kandidáty k označení a vypíše se jen latence
+a překryv dense/rerank top-k.
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from embedding_store import STORE_NAME, load_store, store_exists
+from reranker import CrossEncoderReranker
+from vector_search import VectorIndex
+
+
+# Konfigurace
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "3-Fine_tuning" / "test_questions.txt"
+JUDGMENTS_FILE = Path("rerank_judgments.json")
+RERANK_CANDIDATES = 30
+TOP_K = 6
+REPEATS = 5   # kolikrát změřit latenci každé otázky
+
+
+print("="*70)
+print("📊 FLEURDIN AI - BENCHMARK RERANKINGU")
+print("="*70)
+
+
+def load_questions(path):
+    """Otázky ve tvaru '1. Text otázky' z testovacího souboru."""
+    text = path.read_text(encoding="utf-8")
+    return [match.strip() for match in re.findall(r"^\s*\d+\.\s+(.+)$", text, flags=re.MULTILINE)]
+
+
+def load_data():
+    """Vrátí (chunky, index, store nebo None)."""
+    if store_exists(STORE_NAME):
+        store = load_store(STORE_NAME)
+        return store.chunks, VectorIndex(store.matrix, normalized=True), store
+
+    with open("chunked_data_with_embeddings.json", "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    return chunks, VectorIndex.from_chunks(chunks), None
+
+
+def precision(docs, relevant):
+    return sum(doc["id"] in relevant for doc in docs) / len(docs) if docs else 0.0
+
+
+def main():
+    questions = load_questions(QUESTIONS_FILE)
+    chunks, index, store = load_data()
+    print(f"\n📦 Chunků: {len(chunks)}, otázek: {len(questions)}")
+    print(f"🔎 Kandidátů: {RERANK_CANDIDATES} → top {TOP_K}")
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    reranker = CrossEncoderReranker()
+    reranker.warmup().result()
+
+    judgments = {}
+    if JUDGMENTS_FILE.exists():
+        with open(JUDGMENTS_FILE, "r", encoding="utf-8") as f:
+            judgments = json.load(f)
+
+    latencies = []
+    dense_precision, rerank_precision, overlaps = [], [], []
+    template = {}
+
+    print("\n" + "-"*70)
+    for question in questions:
+        query = model.encode(question, convert_to_numpy=True)
+        if store is not None:
+            query = store.project_query(query)
+        rows, _ = index.search(query, RERANK_CANDIDATES)
+        candidates = [chunks[row] for row in rows]
+
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            reranked, _ = reranker.rerank(question, candidates)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        dense_top, rerank_top = candidates[:TOP_K], reranked[:TOP_K]
+        overlap = len({doc["id"] for doc in dense_top} & {doc["id"] for doc in rerank_top}) / TOP_K
+        overlaps.append(overlap)
+
+        relevant = set(judgments.get(question, {}).get("relevant", []))
+        if relevant:
+            dense_precision.append(precision(dense_top, relevant))
+            rerank_precision.append(precision(rerank_top, relevant))
+            print(f"  P@{TOP_K} dense {dense_precision[-1]:.2f} → rerank {rerank_precision[-1]:.2f}   {question}")
+        else:
+            print(f"  překryv top-{TOP_K} {overlap:.2f}   {question}")
+
+        template[question] = {
+            "relevant": sorted(relevant),
+            "candidates": [{"id": doc["id"], "name": doc.get("name", "")} for doc in candidates]
+        }
+
+    latencies = np.array(latencies)
+    print("\n" + "-"*70)
+    print(f"⏱️  Reranking {RERANK_CANDIDATES} kandidátů: p50 {np.percentile(latencies, 50):.0f} ms, "
+          f"p95 {np.percentile(latencies, 95):.0f} ms")
+    print(f"🔁 Průměrný překryv top-{TOP_K} dense vs. rerank: {np.mean(overlaps):.2f}")
+
+    if dense_precision:
+        print(f"🎯 Precision@{TOP_K} ({len(dense_precision)} hodnocených otázek): "
+              f"dense {np.mean(dense_precision):.2f} → rerank {np.mean(rerank_precision):.2f}")
+    else:
+        with open(JUDGMENTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(template, f, ensure_ascii=False, indent=2)
+        print(f"📝 Chybí hodnocení - šablona uložena do {JUDGMENTS_FILE} "
+              f"(doplň 'relevant' id a spusť znovu)")
+
+    print("\n" + "="*70)
+    print("✅ BENCHMARK DOKONČEN")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
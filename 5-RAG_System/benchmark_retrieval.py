@@ -0,0 +1,221 @@
+"""
+FLEURDIN AI - BENCHMARK VYHLEDÁVÁNÍ
+===================================
+Porovná přibližné indexy (IVF, int8, PQ, binary) a PCA projekci s přesným hledáním nad stejnými embeddingy.
+
+Měří:
+- recall@k proti přesnému (brute-force) hledání
+- latenci dotazu (p50 / p95 v ms) a QPS
+- paměť na chunk u komprimovaných indexů
+- latenci BM25 (lexikální část hybridního hledání)
+
+Dotazy = náhodně vybrané chunky s přidaným šumem (model se nenačítá),
+u BM25 prvních BM25_QUERY_WORDS slov textu vybraných chunků.
+"""
+
+import json
+import time
+
+import numpy as np
+
+from embedding_store import STORE_NAME, load_store, store_exists
+from binary_index import BinaryIndex
+from ivf_index import IVFIndex
+from lexical_index import BM25Index, chunk_document
+from pca import PCAProjection
+from pq_index import PQIndex
+from quantization import Int8Index
+from vector_search import VectorIndex, normalize_rows, recall_at_k
+
+
+# Konfigurace
+TOP_K = 6
+QUERY_COUNT = 200
+QUERY_NOISE = 0.05    # Šum přidaný k vybraným chunkům (aby dotaz nebyl přesně chunk)
+SEED = 42
+
+IVF_N_LISTS = [16, 32, 64, 128]
+IVF_NPROBE = [1, 4, 8, 16]
+
+INT8_RESCORE = [0, 25, 100, 400]   # 0 = bez float přeskórování
+
+PQ_SUBSPACES = [8, 16, 48]          # bajtů na chunk
+PQ_RESCORE = [0, 100]
+
+BINARY_CANDIDATES = [50, 200, 500]
+
+PCA_DIMENSIONS = [256, 192, 128, 96, 64]
+
+BM25_QUERY_WORDS = 6
+BM25_POOL = TOP_K * 4   # jako hybridní hledání (top_k * FUSION_CANDIDATES)
+
+
+print("="*70)
+print("📊 FLEURDIN AI - BENCHMARK VYHLEDÁVÁNÍ")
+print("="*70)
+
+
+def load_data():
+    """Načte normalizovanou matici embeddingů a chunky (store, jinak JSON)."""
+    if store_exists(STORE_NAME):
+        store = load_store(STORE_NAME)
+        return store.matrix, store.chunks
+
+    with open("chunked_data_with_embeddings.json", "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    return VectorIndex.from_chunks(chunks).matrix, chunks
+
+
+def make_queries(matrix, count, noise, seed):
+    """Vybere náhodné chunky a přidá k nim šum."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(matrix.shape[0], size=min(count, matrix.shape[0]), replace=False)
+    queries = np.asarray(matrix[rows]) + rng.normal(scale=noise, size=(len(rows), matrix.shape[1]))
+    return normalize_rows(queries)
+
+
+def run_queries(search, queries, top_k):
+    """Spustí všechny dotazy, vrátí (výsledky, latence v ms)."""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = search(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return results, np.array(latencies)
+
+
+def format_latency(latencies):
+    return (f"p50: {np.percentile(latencies, 50):6.2f} ms   p95: {np.percentile(latencies, 95):6.2f} ms   "
+            f"QPS: {1000 / latencies.mean():8.0f}")
+
+
+def report(name, results, latencies, exact_results):
+    """Vypíše recall@k a latenci jednoho backendu."""
+    recall = np.mean([recall_at_k(r, e) for r, e in zip(results, exact_results)])
+    print(f"  {name:<28} recall@{TOP_K}: {recall:.3f}   {format_latency(latencies)}")
+
+
+def make_text_queries(chunks, count, words, seed):
+    """Krátké textové dotazy - prvních pár slov náhodně vybraných chunků."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(chunks), size=min(count, len(chunks)), replace=False)
+    return [" ".join(chunks[row].get("text", "").split()[:words]) for row in rows]
+
+
+def main():
+    matrix, chunks = load_data()
+    print(f"\n📦 Chunků: {matrix.shape[0]}, dimenze: {matrix.shape[1]}")
+
+    queries = make_queries(matrix, QUERY_COUNT, QUERY_NOISE, SEED)
+    print(f"🔎 Dotazů: {len(queries)}, top_k: {TOP_K}")
+
+    # Přesné hledání = referenční výsledky
+    print("\n" + "-"*70)
+    print("1️⃣  PŘESNÉ HLEDÁNÍ")
+    print("-"*70)
+    exact = VectorIndex(matrix, normalized=True)
+    exact_results, latencies = run_queries(exact.search, queries, TOP_K)
+    report("exact", exact_results, latencies, exact_results)
+
+    # IVF - počet oddílů vs. nprobe (ladění pgvector ivfflat)
+    print("\n" + "-"*70)
+    print("2️⃣  IVF")
+    print("-"*70)
+    for n_lists in IVF_N_LISTS:
+        start = time.perf_counter()
+        ivf = IVFIndex.build(matrix, n_lists=n_lists)
+        sizes = ivf.list_sizes()
+        print(f"  lists={n_lists}: stavba {time.perf_counter() - start:.1f} s, "
+              f"velikost oddílu min/průměr/max: {sizes.min()}/{sizes.mean():.0f}/{sizes.max()}")
+
+        for nprobe in IVF_NPROBE:
+            if nprobe > n_lists:
+                continue
+            search = lambda q, k: ivf.search(q, k, nprobe=nprobe)
+            results, latencies = run_queries(search, queries, TOP_K)
+            report(f"ivf lists={n_lists} nprobe={nprobe}", results, latencies, exact_results)
+
+    # INT8 - paměť a recall delta proti float32
+    print("\n" + "-"*70)
+    print("3️⃣  INT8 KVANTIZACE")
+    print("-"*70)
+    int8 = Int8Index.build(matrix)
+    float_bytes = matrix.shape[0] * matrix.shape[1] * 4
+    print(f"  Paměť: float32 {float_bytes / 1024 / 1024:.1f} MB → int8 {int8.nbytes / 1024 / 1024:.1f} MB "
+          f"({int8.nbytes / matrix.shape[0]:.0f} B/chunk)")
+
+    for rescore in INT8_RESCORE:
+        int8.matrix = matrix if rescore else None
+        search = lambda q, k: int8.search(q, k, rescore=rescore)
+        results, latencies = run_queries(search, queries, TOP_K)
+        report(f"int8 rescore={rescore}", results, latencies, exact_results)
+
+    # PQ - paměť na chunk vs. recall
+    print("\n" + "-"*70)
+    print("4️⃣  PRODUCT QUANTIZATION")
+    print("-"*70)
+    for m in PQ_SUBSPACES:
+        start = time.perf_counter()
+        pq = PQIndex.build(matrix, m=m, matrix_for_rescore=matrix)
+        print(f"  m={m}: trénink {time.perf_counter() - start:.1f} s, "
+              f"{pq.codes.nbytes / len(pq):.0f} B/chunk (+ codebooky {pq.codebooks.nbytes / 1024:.0f} KB)")
+
+        for rescore in PQ_RESCORE:
+            search = lambda q, k: pq.search(q, k, rescore=rescore)
+            results, latencies = run_queries(search, queries, TOP_K)
+            report(f"pq m={m} rescore={rescore}", results, latencies, exact_results)
+
+    # BINARY - Hammingův prefiltr + přesné přeskórování
+    print("\n" + "-"*70)
+    print("5️⃣  BINARY (SIGN BITS)")
+    print("-"*70)
+    binary = BinaryIndex.build(matrix)
+    print(f"  Paměť: {binary.nbytes / 1024:.0f} KB ({binary.nbytes / len(binary):.0f} B/chunk)")
+
+    binary.matrix = None
+    results, latencies = run_queries(binary.search, queries, TOP_K)
+    report("binary bez přeskórování", results, latencies, exact_results)
+
+    binary.matrix = matrix
+    for candidates in BINARY_CANDIDATES:
+        search = lambda q, k: binary.search(q, k, candidates=candidates)
+        results, latencies = run_queries(search, queries, TOP_K)
+        report(f"binary candidates={candidates}", results, latencies, exact_results)
+
+    # PCA - recall a latence podle cílové dimenze (přesné hledání v nižší dimenzi)
+    print("\n" + "-"*70)
+    print("6️⃣  PCA PROJEKCE")
+    print("-"*70)
+    for dimensions in PCA_DIMENSIONS:
+        if dimensions >= matrix.shape[1]:
+            continue
+        projection = PCAProjection.fit(matrix, dimensions)
+        reduced = VectorIndex(projection.transform(matrix), normalized=True)
+        reduced_queries = np.array([projection.transform_query(q) for q in queries])
+        print(f"  dim={dimensions}: vysvětlený rozptyl {projection.explained_variance_ratio.sum():.1%}, "
+              f"{reduced.matrix.nbytes / len(reduced):.0f} B/chunk")
+
+        results, latencies = run_queries(reduced.search, reduced_queries, TOP_K)
+        report(f"pca {matrix.shape[1]}→{dimensions}", results, latencies, exact_results)
+
+    # BM25 - latence lexikální části hybridního hledání
+    print("\n" + "-"*70)
+    print("7️⃣  BM25")
+    print("-"*70)
+    start = time.perf_counter()
+    bm25 = BM25Index.from_texts(chunk_document(chunk) for chunk in chunks)
+    print(f"  stavba {time.perf_counter() - start:.2f} s, termů: {len(bm25.terms)}")
+
+    text_queries = make_text_queries(chunks, QUERY_COUNT, BM25_QUERY_WORDS, SEED)
+    _, latencies = run_queries(bm25.search, text_queries, BM25_POOL)
+    print(f"  {f'bm25 top_k={BM25_POOL}':<28} {format_latency(latencies)}")
+
+    print("\n" + "="*70)
+    print("✅ BENCHMARK DOKONČEN")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+FLEURDIN AI - BINARY INDEX
+==========================
+Levné první kolo hledání přes znaménkové bity embeddingů.
+
+Každý 384-dim vektor se zabalí do 48 bajtů (1 bit = znaménko dimenze).
+Kandidáti se hledají podle Hammingovy vzdálenosti (XOR + popcount)
+nad uint8 polem, které se celé vejde do L2/L3 cache. Několik set
+nejlepších kandidátů se pak přeskóruje přesnou cosine similarity.
+"""
+
+import numpy as np
+
+from vector_search import normalize_vector, take_rows, top_k_indices
+
+
+BINARY_SUFFIX = ".bin.npy"
+
+# Počet jedničkových bitů pro každou hodnotu bajtu (fallback pro numpy < 2.0)
+_POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def popcount(array):
+    """Počet jedničkových bitů v každém bajtu."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(array)
+    return _POPCOUNT_TABLE[array]
+
+
+def pack_signs(matrix, block_size=65536):
+    """Zabalí znaménka matice do (n, d/8) uint8 pole."""
+    packed = np.empty((matrix.shape[0], (matrix.shape[1] + 7) // 8), dtype=np.uint8)
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size])
+        packed[start:start + block_size] = np.packbits(block > 0, axis=1)
+    return packed
+
+
+class BinaryIndex:
+    """Hammingův prefiltr nad znaménkovými bity + přesné přeskórování"""
+
+    def __init__(self, codes, matrix=None, candidates=200):
+        """
+        Parametry:
+        - codes: (n, d/8) uint8 zabalená znaménka
+        - matrix: float32 normalizovaná matice pro přeskórování (None = bez něj)
+        - candidates: kolik nejbližších (Hamming) kandidátů přeskórovat
+        """
+        self.codes = codes
+        self.matrix = matrix
+        self.candidates = candidates
+
+    @classmethod
+    def build(cls, matrix, candidates=200):
+        return cls(pack_signs(matrix), matrix=matrix, candidates=candidates)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def hamming_distances(self, query, rows=None):
+        """Hammingova vzdálenost dotazu ke všem chunkům (nebo jen k rows)."""
+        query_bits = np.packbits(query > 0)
+        codes = self.codes if rows is None else self.codes[rows]
+        return popcount(np.bitwise_xor(codes, query_bits)).sum(axis=1, dtype=np.int32)
+
+    def search(self, query_embedding, top_k=5, candidates=None, rows=None):
+        """
+        Najde top_k chunků - Hammingův prefiltr, pak přesná cosine similarity.
+
+        Parametry:
+        - rows: volitelně omezení na podmnožinu řádků (slice nebo pole indexů,
+          jako VectorIndex.search) - skórují se jen ty, ostatní se nečtou
+
+        Vrací (rows, scores) - indexy řádků a jejich similarity, sestupně.
+        Bez float matice jsou skóre 1 - hamming / počet bitů.
+        """
+        query = normalize_vector(query_embedding)
+        distances = self.hamming_distances(query, rows)
+
+        if self.matrix is None:
+            best = top_k_indices(-distances, top_k)
+            return take_rows(rows, best), 1 - distances[best] / query.shape[0]
+
+        shortlist = np.sort(take_rows(rows, top_k_indices(-distances, max(candidates or self.candidates, top_k))))
+        exact = np.asarray(self.matrix[shortlist]) @ query
+        best = top_k_indices(exact, top_k)
+        return shortlist[best], exact[best]
+
+    def save(self, path):
+        np.save(path, self.codes)
+
+    @classmethod
+    def load(cls, path, matrix=None, candidates=200):
+        codes = np.load(path)
+        if matrix is not None and codes.shape[0] != matrix.shape[0]:
+            raise ValueError(f"Binární kódy ({codes.shape[0]} řádků) neodpovídají matici ({matrix.shape[0]} řádků)")
+        return cls(codes, matrix=matrix, candidates=candidates)
@@ -0,0 +1,133 @@
+"""
+FLEURDIN AI - CONTEXT COMPRESSOR
+================================
+Extraktivní komprese kontextu před AnswerNode.
+
+Knižní chunky mají 1200 znaků a k otázce se z nich obvykle vztahuje
+jen pár vět. Každý chunk se rozdělí na věty, všechny věty se porovnají
+s embeddingem otázky (nové věty jednou dávkou přes embedding model)
+a ponechají se nejrelevantnější věty do limitu tokenů.
+
+Věty zůstávají u svého chunku (id, název, zdroj se nemění) a v původním
+pořadí, vynechané úseky nahradí "…".
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from token_budget import count_tokens
+from vector_search import normalize_rows, normalize_vector
+
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+MIN_SENTENCE_CHARS = 15   # Kratší úlomky (nadpisy, čísla) se připojí k další větě
+
+
+def split_sentences(text):
+    """Rozdělí text na věty (krátké úlomky spojí s následující větou)."""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_SPLIT_RE.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= MIN_SENTENCE_CHARS:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+class ContextCompressor:
+    """Výběr nejrelevantnějších vět z chunků do limitu tokenů"""
+
+    def __init__(self, embed_documents, token_budget=1200, cache_size=20000):
+        """
+        Parametry:
+        - embed_documents: funkce seznam textů → seznam embeddingů (jedna dávka)
+        - token_budget: max. tokenů textu všech chunků dohromady
+        - cache_size: kolik embeddingů vět si pamatovat (chunky se opakují)
+        """
+        self.embed_documents = embed_documents
+        self.token_budget = token_budget
+        self.cache_size = cache_size
+        self.sentence_cache = OrderedDict()    # věta -> normalizovaný embedding
+        self.lock = threading.Lock()    # Uzly grafu můžou běžet souběžně (async sezení)
+
+    def _embed(self, sentences):
+        """Embeddingy vět - z cache, chybějící jednou dávkou."""
+        with self.lock:
+            missing = list(dict.fromkeys(s for s in sentences if s not in self.sentence_cache))
+            if missing:
+                vectors = normalize_rows(np.asarray(self.embed_documents(missing), dtype=np.float32))
+                for sentence, vector in zip(missing, vectors):
+                    self.sentence_cache[sentence] = vector
+                while len(self.sentence_cache) > self.cache_size:
+                    self.sentence_cache.popitem(last=False)
+
+            for sentence in sentences:
+                self.sentence_cache.move_to_end(sentence)
+            return np.stack([self.sentence_cache[s] for s in sentences])
+
+    def compress(self, query_embedding, docs, token_budget=None):
+        """
+        Vrátí kopie chunků jen s nejrelevantnějšími větami.
+
+        Každý chunk si nejdřív ponechá svou nejlepší větu (aby se neztratil
+        zdroj), zbytek limitu se plní větami podle similarity s otázkou.
+        Chunky, do kterých se nevešla ani jedna věta, vypadnou.
+        """
+        token_budget = token_budget or self.token_budget
+        doc_sentences = [split_sentences(doc.get("text", "")) for doc in docs]
+        flat = [(d, i, sentence) for d, sentences in enumerate(doc_sentences)
+                for i, sentence in enumerate(sentences)]
+        if not flat:
+            return docs
+
+        vectors = self._embed([sentence for _, _, sentence in flat])
+        scores = vectors @ normalize_vector(query_embedding)
+        tokens = np.array([count_tokens(sentence) for _, _, sentence in flat])
+
+        order = np.argsort(-scores, kind="stable")
+        best_per_doc = {}
+        for position in order:
+            best_per_doc.setdefault(flat[position][0], position)
+
+        # Nejdřív nejlepší věta každého chunku (v pořadí relevance), pak ostatní
+        first = sorted(best_per_doc.values(), key=lambda position: -scores[position])
+        first_set = set(first)
+        rest = [position for position in order if position not in first_set]
+
+        kept = set()
+        used = 0
+        for position in first + rest:
+            if used + tokens[position] <= token_budget:
+                kept.add(position)
+                used += tokens[position]
+
+        compressed = []
+        for d, doc in enumerate(docs):
+            positions = sorted(p for p in kept if flat[p][0] == d)
+            if not positions:
+                continue
+            pieces = []
+            previous = -1
+            for p in positions:
+                index = flat[p][1]
+                if index > previous + 1:
+                    pieces.append("…")
+                pieces.append(flat[p][2])
+                previous = index
+            if previous < len(doc_sentences[d]) - 1:
+                pieces.append("…")
+
+            compressed_doc = dict(doc)
+            compressed_doc["text"] = " ".join(pieces)
+            compressed.append(compressed_doc)
+
+        return compressed
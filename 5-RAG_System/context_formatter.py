@@ -0,0 +1,80 @@
+"""
+FLEURDIN AI - CONTEXT FORMATTER
+===============================
+Kompaktní text kontextu pro AnswerNode.
+
+Do promptu jdou z každého chunku jen název, zdroj a text - žádné embeddingy
+ani ostatní metadata. Šablona je stabilní (stejné chunky = stejný prompt)
+a celý kontext má pevný limit tokenů.
+"""
+
+from token_budget import count_tokens, truncate_to_tokens
+
+
+CONTEXT_MAX_TOKENS = 2000   # Pevný strop tokenů kontextu v promptu
+MIN_BLOCK_TOKENS = 40       # Useknutý poslední blok kratší než tohle se vynechá
+
+SYSTEM_PROMPT = (
+    "Jsi zkušený aromaterapeut a expert na přírodní medicínu s mnohaletou praxí. "
+    "Odpovídej přátelsky, ale profesionálně - jako by ses bavil s klientem při konzultaci. "
+    "\n\n"
+    "DŮLEŽITÉ POKYNY:\n"
+    "1. Odpovídej POUZE na základě poskytnutého kontextu z databáze\n"
+    "2. Odpovídej STEJNÝM JAZYKEM jako otázka uživatele (čeština/slovenština)\n"
+    "3. Používej přirozený, vstřícný tón - ne jako databáze, ale jako expert který radí\n"
+    "4. VŽDY doporuč KOMBINACI esenciálních olejů A bylinných přípravků (čaje, tinktury, atd.)\n"
+    "5. Pro každé doporučení uveď:\n"
+    "   - Konkrétní názvy (esenciální oleje + bylinky)\n"
+    "   - Jak je používat (inhalace, masáž, difuzér, čaj, tinktura)\n"
+    "   - Případná upozornění\n"
+    "6. Struktura odpovědi:\n"
+    "   - Nejdřív esenciální oleje (pokud jsou v kontextu)\n"
+    "   - Pak bylinné alternativy/doplňky (pokud jsou v kontextu)\n"
+    "7. Nepiš to jako seznam z databáze, ale jako radu od zkušeného terapeuta"
+)
+
+
+def human_prompt(question, context):
+    """Text dotazu pro AnswerNode."""
+    return (
+        f"Klient se ptá: {question}\n\n"
+        f"Máš k dispozici tyto informace:\n{context}\n\n"
+        f"Doporuč KOMBINACI esenciálních olejů i bylinných přípravků, pokud jsou dostupné:"
+    )
+
+
+def doc_name(doc):
+    return doc.get("entity_name") or doc.get("name") or doc.get("id", "")
+
+
+def doc_source(doc):
+    metadata = doc.get("metadata") or {}
+    return metadata.get("source") or doc.get("source") or doc.get("type", "")
+
+
+def format_doc(number, doc):
+    """Jeden blok kontextu: '[1] Název | zdroj' + text."""
+    return f"[{number}] {doc_name(doc)} | {doc_source(doc)}\n{doc.get('text', '').strip()}"
+
+
+def format_context(docs, max_tokens=CONTEXT_MAX_TOKENS):
+    """
+    Poskládá bloky chunků (v pořadí relevance) do limitu max_tokens.
+    Blok, který se už nevejde celý, se usekne (nebo vynechá, pokud by
+    z něj zbyl jen úlomek), další chunky se zahodí.
+    """
+    blocks = []
+    used = 0
+    for number, doc in enumerate(docs, 1):
+        block = format_doc(number, doc)
+        tokens = count_tokens(block) + 1    # + oddělovač
+        if used + tokens > max_tokens:
+            remaining = max_tokens - used - 1
+            if remaining >= MIN_BLOCK_TOKENS:
+                blocks.append(truncate_to_tokens(block, remaining))
+            break
+        blocks.append(block)
+        used += tokens
+
+    # Pojistka - strop platí i po spojení bloků
+    return truncate_to_tokens("\n\n".join(blocks), max_tokens)
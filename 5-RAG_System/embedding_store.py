@@ -0,0 +1,251 @@
+"""
+FLEURDIN AI - EMBEDDING STORE
+=============================
+Binární úložiště embeddingů místo chunked_data_with_embeddings.json.
+
+Formát (soubory se stejným základem jména):
+- <name>.npy       - float32 matice (n, d), řádky normalizované na délku 1
+- <name>.meta.json - metadata + seznam chunků bez embeddingů (index = řádek)
+- <name>.int8.npz  - volitelně int8 kódy matice (viz quantization.py)
+- <name>.bin.npy   - volitelně znaménkové bity (viz binary_index.py)
+- <name>.pca.npz   - volitelně PCA projekce, matice je pak v nižší dimenzi (viz pca.py)
+- <name>.bm25.npz  - volitelně BM25 invertovaný index textu chunků (viz lexical_index.py)
+- <name>.ivf.npz, <name>.pq.npz - indexy přibližného hledání, staví je
+  RAG_agents_script.py a ukládají s index_version úložiště (při změně se postaví znovu)
+
+Matice se otevírá přes np.memmap (mmap_mode="r"), takže se nic nekopíruje
+a víc procesů sdílí stejnou page cache.
+
+Převod existujícího JSONu:
+    python embedding_store.py chunked_data_with_embeddings.json
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from binary_index import BINARY_SUFFIX, BinaryIndex
+from ivf_index import IVF_SUFFIX
+from lexical_index import BM25_SUFFIX, BM25Builder, chunk_document
+from pca import PCA_SUFFIX, PCAProjection
+from pq_index import PQ_SUFFIX
+from quantization import INT8_SUFFIX, Int8Index
+from vector_search import normalize_rows
+
+
+STORE_NAME = "chunked_data_embeddings"
+FORMAT_VERSION = 1
+
+
+class EmbeddingStore:
+    """Načtené úložiště - memmap matice + chunky (bez embeddingů) po řádcích"""
+
+    def __init__(self, matrix, chunks, meta, projection=None):
+        self.matrix = matrix
+        self.chunks = chunks
+        self.meta = meta
+        self.projection = projection
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def embedding_model(self):
+        return self.meta.get("embedding_model")
+
+    def project_query(self, query_embedding):
+        """Převede embedding dotazu do prostoru uložené matice (PCA, pokud je)."""
+        if self.projection is None:
+            return query_embedding
+        return self.projection.transform_query(query_embedding)
+
+
+def store_paths(base_path):
+    """Vrátí (cesta k matici, cesta k metadatům) pro daný základ jména."""
+    base_path = Path(base_path)
+    return base_path.with_suffix(".npy"), base_path.with_suffix(".meta.json")
+
+
+def int8_path(base_path):
+    """Cesta k int8 kódům uloženým vedle matice."""
+    return Path(base_path).with_suffix(INT8_SUFFIX)
+
+
+def binary_path(base_path):
+    """Cesta k zabaleným znaménkovým bitům uloženým vedle matice."""
+    return Path(base_path).with_suffix(BINARY_SUFFIX)
+
+
+def pca_path(base_path):
+    """Cesta k PCA projekci uložené vedle matice."""
+    return Path(base_path).with_suffix(PCA_SUFFIX)
+
+
+def bm25_path(base_path):
+    """Cesta k BM25 indexu uloženému vedle matice."""
+    return Path(base_path).with_suffix(BM25_SUFFIX)
+
+
+def ivf_path(base_path):
+    """Cesta k IVF indexu uloženému vedle matice."""
+    return Path(base_path).with_suffix(IVF_SUFFIX)
+
+
+def pq_path(base_path):
+    """Cesta k PQ kódům uloženým vedle matice."""
+    return Path(base_path).with_suffix(PQ_SUFFIX)
+
+
+def index_version(*paths):
+    """
+    Verze indexu chunků ze zdrojových souborů (čas změny + velikost).
+    Mění se s každým přepsáním úložiště - pro zneplatnění cache.
+    """
+    parts = []
+    for path in paths:
+        stat = Path(path).stat()
+        parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+
+def store_exists(base_path):
+    matrix_path, meta_path = store_paths(base_path)
+    return matrix_path.exists() and meta_path.exists()
+
+
+def save_store(base_path, chunks, embeddings, embedding_model, stats=None,
+               quantize_int8=False, binary_codes=False, pca_dimensions=None, lexical_index=False,
+               group_by=("type", "tier")):
+    """
+    Uloží embeddingy jako float32 matici a chunky jako JSON sidecar.
+
+    Parametry:
+    - base_path: základ jména souborů (bez přípony)
+    - chunks: seznam chunků (klíč 'embedding' se do sidecaru neukládá)
+    - embeddings: (n, d) matice embeddingů ve stejném pořadí jako chunks
+    - embedding_model: název modelu (kvůli kontrole při načítání)
+    - stats: volitelné statistiky z chunkingu
+    - quantize_int8: uložit navíc int8 kódy (<name>.int8.npz)
+    - binary_codes: uložit navíc znaménkové bity (<name>.bin.npy)
+    - pca_dimensions: uložit matici promítnutou PCA do této dimenze (None = bez PCA)
+    - lexical_index: uložit navíc BM25 index textu chunků (<name>.bm25.npz)
+    - group_by: řádky se uloží seřazené podle těchto klíčů, takže každý typ
+      (a v něm každý tier) tvoří souvislý rozsah - vyhledávání po typech
+      i filtr podle tieru pak pracují s pohledem do matice bez kopie
+    """
+    matrix_path, meta_path = store_paths(base_path)
+    matrix = normalize_rows(embeddings)
+    original_dimensions = int(matrix.shape[1])
+
+    if matrix.shape[0] != len(chunks):
+        raise ValueError(f"Počet embeddingů ({matrix.shape[0]}) neodpovídá počtu chunků ({len(chunks)})")
+
+    if group_by:
+        order = sorted(range(len(chunks)),
+                       key=lambda row: tuple(str(chunks[row].get(key, "")) for key in group_by))
+        chunks = [chunks[row] for row in order]
+        matrix = matrix[order]
+
+    if pca_dimensions:
+        projection = PCAProjection.fit(matrix, pca_dimensions)
+        projection.save(pca_path(base_path))
+        matrix = projection.transform(matrix)
+    elif pca_path(base_path).exists():
+        # Stará projekce by nesouhlasila s novou maticí
+        pca_path(base_path).unlink()
+
+    np.save(matrix_path, matrix)
+
+    if quantize_int8:
+        Int8Index.build(matrix).save(int8_path(base_path))
+
+    if binary_codes:
+        BinaryIndex.build(matrix).save(binary_path(base_path))
+
+    if lexical_index:
+        # Chunky se přidávají po jednom ve výsledném pořadí řádků
+        builder = BM25Builder()
+        for chunk in chunks:
+            builder.add(chunk_document(chunk))
+        builder.build().save(bm25_path(base_path))
+
+    # Sidecary z minulého uložení, které se teď nepřegenerovaly, by ukazovaly na jiné řádky
+    for enabled, sidecar_path in ((quantize_int8, int8_path), (binary_codes, binary_path),
+                                  (lexical_index, bm25_path)):
+        if not enabled and sidecar_path(base_path).exists():
+            sidecar_path(base_path).unlink()
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "embedding_model": embedding_model,
+        "embedding_dimensions": int(matrix.shape[1]),
+        "original_dimensions": original_dimensions,
+        "pca": bool(pca_dimensions),
+        "group_by": list(group_by or []),
+        "count": int(matrix.shape[0]),
+        "normalized": True,
+        "stats": stats or {},
+        "chunks": [
+            {key: value for key, value in chunk.items() if key != "embedding"}
+            for chunk in chunks
+        ]
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    return matrix_path, meta_path
+
+
+def load_store(base_path):
+    """
+    Otevře úložiště - matice přes memmap (zero-copy), chunky ze sidecaru.
+    """
+    matrix_path, meta_path = store_paths(base_path)
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    matrix = np.load(matrix_path, mmap_mode="r")
+
+    if matrix.dtype != np.float32 or matrix.shape[0] != meta["count"]:
+        raise ValueError(f"Úložiště {matrix_path} neodpovídá metadatům {meta_path}")
+
+    projection = PCAProjection.load(pca_path(base_path)) if meta.get("pca") else None
+
+    chunks = meta.pop("chunks")
+    return EmbeddingStore(matrix, chunks, meta, projection)
+
+
+def convert_json(json_path, base_path=None):
+    """Převede chunked_data_with_embeddings.json do binárního úložiště."""
+    json_path = Path(json_path)
+    if base_path is None:
+        base_path = json_path.with_name(STORE_NAME)
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    chunks = data["chunks"]
+    embeddings = np.array([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+
+    return save_store(
+        base_path,
+        chunks,
+        embeddings,
+        embedding_model=data.get("embedding_model", ""),
+        stats=data.get("stats")
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Použití: python embedding_store.py <chunked_data_with_embeddings.json> [základ jména]")
+        sys.exit(1)
+
+    matrix_path, meta_path = convert_json(*sys.argv[1:3])
+    print(f"✅ Matice: {matrix_path} ({matrix_path.stat().st_size / 1024 / 1024:.1f} MB)")
+    print(f"✅ Metadata: {meta_path} ({meta_path.stat().st_size / 1024 / 1024:.1f} MB)")
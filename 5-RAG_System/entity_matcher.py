@@ -0,0 +1,158 @@
+"""
+FLEURDIN AI - ENTITY MATCHER
+============================
+Rychlá cesta pro otázky, které přímo jmenují olej nebo bylinku
+("Na co se používá máta peprná?").
+
+Aho-Corasick automat nad názvy entit (český, anglický i latinský název
+oleje z parse_essential_oils, entity_name z ChunkingStrategy) najde všechny
+zmíněné entity jedním průchodem otázkou. Porovnává se bez diakritiky
+a bez ohledu na velikost písmen, jen celá slova.
+"""
+
+import re
+import unicodedata
+from collections import deque
+
+import numpy as np
+
+
+MIN_ALIAS_LENGTH = 3    # Kratší názvy by dávaly falešné shody
+MAX_ALIAS_WORDS = 6     # Delší "názvy" jsou nadpisy kapitol, ne entity
+
+
+def fold_text(text):
+    """Malá písmena bez diakritiky ("Máta peprná" → "mata peprna")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def entity_aliases(chunk):
+    """
+    Vrátí (entita, [názvy]) pro chunk.
+    Olej "Oregano - Dobromysl obecná" dá názvy "Oregano", "Dobromysl obecná"
+    + anglický a latinský název z metadat.
+    """
+    entity = chunk.get("entity_name") or chunk.get("name")
+    if not entity or entity.startswith(("Odstavec", "Kniha")):
+        return None, []
+
+    metadata = chunk.get("metadata") or {}
+    names = [entity, *re.split(r"\s+[-–]\s+", entity)]
+    names += [metadata.get("english_name", ""), metadata.get("latin_name", "")]
+
+    aliases = []
+    for name in names:
+        name = str(name or "").strip()
+        if len(name) >= MIN_ALIAS_LENGTH and len(name.split()) <= MAX_ALIAS_WORDS:
+            aliases.append(name)
+    return entity, aliases
+
+
+class AhoCorasick:
+    """Automat pro hledání mnoha vzorů najednou"""
+
+    def __init__(self):
+        self.goto = [{}]        # goto[stav][znak] = další stav
+        self.fail = [0]
+        self.output = [[]]      # output[stav] = [(délka vzoru, hodnota)]
+
+    def add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((len(pattern), value))
+
+    def build(self):
+        """Spočítá fail odkazy (BFS) - volat po přidání všech vzorů."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        return self
+
+    def find(self, text):
+        """Vrátí všechny shody jako (začátek, konec, hodnota)."""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                matches.append((position - length + 1, position + 1, value))
+        return matches
+
+
+class EntityMatcher:
+    """Najde entity zmíněné v otázce a vrátí jejich řádky (chunky)"""
+
+    def __init__(self, automaton, entity_rows):
+        self.automaton = automaton
+        self.entity_rows = entity_rows    # entita -> pole řádků
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        automaton = AhoCorasick()
+        entity_rows = {}
+        seen = set()
+
+        for row, chunk in enumerate(chunks):
+            entity, aliases = entity_aliases(chunk)
+            if entity is None:
+                continue
+            entity_rows.setdefault(entity, []).append(row)
+            for alias in aliases:
+                key = (fold_text(alias), entity)
+                if key not in seen:
+                    seen.add(key)
+                    automaton.add(key[0], entity)
+
+        entity_rows = {entity: np.array(rows, dtype=np.int64) for entity, rows in entity_rows.items()}
+        return cls(automaton.build(), entity_rows)
+
+    def match(self, question):
+        """
+        Entity zmíněné v otázce (celá slova, nejdelší shody bez překryvu),
+        v pořadí výskytu.
+        """
+        text = fold_text(question)
+        matches = []
+        for start, end, entity in self.automaton.find(text):
+            before_ok = start == 0 or not text[start - 1].isalnum()
+            after_ok = end == len(text) or not text[end].isalnum()
+            if before_ok and after_ok:
+                matches.append((start, end, entity))
+
+        # Nejdelší shody mají přednost, překrývající se kratší se zahodí
+        # (stejný úsek může patřit víc entitám)
+        matches.sort(key=lambda match: (-(match[1] - match[0]), match[0]))
+        taken = set()
+        found = {}
+        for start, end, entity in matches:
+            if any(start < t_end and t_start < end and (t_start, t_end) != (start, end)
+                   for t_start, t_end in taken):
+                continue
+            taken.add((start, end))
+            found.setdefault(entity, start)
+
+        return sorted(found, key=found.get)
+
+    def rows_for(self, entities):
+        """Řádky všech chunků daných entit."""
+        if not entities:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self.entity_rows[entity] for entity in entities]))
@@ -0,0 +1,95 @@
+"""
+FLEURDIN AI - FILTER INDEX
+==========================
+Bitmapový index metadat pro filtrované lokální vyhledávání.
+
+Pro každou hodnotu polí tier / type / entity_type / content_type se uloží
+zabalená bitmapa řádků (1 bit = 1 chunk). Filtr se vyhodnotí bitovými
+operacemi a skóruje se jen povolená podmnožina - stejně jako filter_tier
+a filter_type v Supabase RPC match_chunks.
+"""
+
+import numpy as np
+
+
+FILTER_FIELDS = ("tier", "type", "entity_type", "content_type")
+
+
+class BitmapFilterIndex:
+    """Zabalené bitmapy řádků pro každou hodnotu filtrovaných polí"""
+
+    def __init__(self, bitmaps, count):
+        """
+        Parametry:
+        - bitmaps: {pole: {hodnota: zabalená uint8 bitmapa}}
+        - count: počet řádků (chunků)
+        """
+        self.bitmaps = bitmaps
+        self.count = count
+
+    @classmethod
+    def from_chunks(cls, chunks, fields=FILTER_FIELDS):
+        bitmaps = {}
+        for field in fields:
+            values = np.array([str(chunk.get(field, "")) for chunk in chunks])
+            bitmaps[field] = {
+                value: np.packbits(values == value)
+                for value in np.unique(values).tolist()
+            }
+        return cls(bitmaps, len(chunks))
+
+    def values(self, field):
+        """Známé hodnoty pole."""
+        return sorted(self.bitmaps.get(field, {}))
+
+    def bitmap(self, **filters):
+        """
+        Zabalená bitmapa řádků, které splňují všechny filtry.
+
+        filters: pole=hodnota nebo pole=[hodnoty] (hodnoty jsou OR, pole AND),
+        None = pole se nefiltruje.
+        """
+        result = np.full((self.count + 7) // 8, 0xFF, dtype=np.uint8)
+        for field, allowed in filters.items():
+            if allowed is None:
+                continue
+            if field not in self.bitmaps:
+                raise ValueError(f"Pole '{field}' není ve filter indexu")
+            if isinstance(allowed, str):
+                allowed = [allowed]
+
+            field_bitmap = np.zeros_like(result)
+            for value in allowed:
+                if value in self.bitmaps[field]:
+                    field_bitmap |= self.bitmaps[field][value]
+            result &= field_bitmap
+        return result
+
+    def mask(self, **filters):
+        """Bool maska řádků (délka = počet chunků), viz bitmap()."""
+        return np.unpackbits(self.bitmap(**filters), count=self.count).astype(bool)
+
+    def rows(self, **filters):
+        """Indexy řádků, které splňují filtry."""
+        return np.flatnonzero(self.mask(**filters))
+
+
+def restrict_rows(rows, mask):
+    """
+    Omezí oddíl řádků (slice nebo pole indexů) na řádky povolené maskou.
+    Pokud je povolený celý souvislý rozsah, zůstane slice (bez kopie).
+    Vrací None, pokud nezbyl žádný řádek.
+    """
+    if isinstance(rows, slice):
+        allowed = mask[rows]
+        if allowed.all():
+            return rows
+        restricted = np.flatnonzero(allowed) + rows.start
+    else:
+        restricted = rows[mask[rows]]
+
+    if len(restricted) == 0:
+        return None
+    if restricted[-1] - restricted[0] + 1 == len(restricted):
+        return slice(int(restricted[0]), int(restricted[-1]) + 1)
+    return restricted
@@ -0,0 +1,191 @@
+"""
+FLEURDIN AI - IVF INDEX
+=======================
+Inverted-file index (k-means oddíly) - lokální obdoba pgvector `ivfflat`.
+
+Chunky se rozdělí do n_lists oddílů podle nejbližšího centroidu.
+Dotaz prohledá jen nprobe nejbližších oddílů:
+- víc oddílů / méně nprobe = rychlejší, ale nižší recall
+- nprobe = n_lists = přesné hledání
+
+Centroidy se učí vektorizovaným mini-batch k-means (cosine, normalizované).
+"""
+
+import numpy as np
+
+from vector_search import normalize_rows, normalize_vector, top_k_indices
+
+
+IVF_SUFFIX = ".ivf.npz"
+
+def minibatch_kmeans(matrix, n_clusters, batch_size=1024, iterations=100, seed=42, spherical=True):
+    """
+    Mini-batch k-means.
+
+    Parametry:
+    - matrix: (n, d) matice (pro spherical=True normalizovaná)
+    - n_clusters: počet centroidů
+    - batch_size: počet řádků v jedné dávce
+    - iterations: počet dávek
+    - seed: seed pro inicializaci a výběr dávek
+    - spherical: True = similarity je dot product a centroidy se normalizují,
+      False = klasická euklidovská vzdálenost (např. subprostory u PQ)
+
+    Vrací (n_clusters, d) centroidy.
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    n_clusters = min(n_clusters, n)
+
+    centroids = np.array(matrix[rng.choice(n, size=n_clusters, replace=False)], dtype=np.float32)
+    counts = np.zeros(n_clusters, dtype=np.float64)
+
+    for _ in range(iterations):
+        batch = np.asarray(matrix[rng.choice(n, size=min(batch_size, n), replace=False)], dtype=np.float32)
+        labels = nearest_centroids(batch, centroids, spherical)
+
+        # Součty a počty přiřazených řádků pro všechny centroidy najednou
+        batch_counts = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+        batch_sums = np.zeros_like(centroids)
+        np.add.at(batch_sums, labels, batch)
+
+        # Klouzavý průměr s učícím krokem 1 / (počet dosud přiřazených)
+        touched = batch_counts > 0
+        counts[touched] += batch_counts[touched]
+        eta = (batch_counts[touched] / counts[touched])[:, None].astype(np.float32)
+        batch_means = batch_sums[touched] / batch_counts[touched][:, None].astype(np.float32)
+        centroids[touched] = (1 - eta) * centroids[touched] + eta * batch_means
+        if spherical:
+            centroids = normalize_rows(centroids)
+
+    return centroids
+
+
+def nearest_centroids(block, centroids, spherical=True):
+    """
+    Index nejbližšího centroidu pro každý řádek bloku.
+    Euklidovsky: argmin |x - c|² = argmax (x·c - |c|²/2)
+    """
+    scores = block @ centroids.T
+    if not spherical:
+        scores -= 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    return np.argmax(scores, axis=1)
+
+
+def assign_to_centroids(matrix, centroids, block_size=65536, spherical=True):
+    """Přiřadí každý řádek k nejbližšímu centroidu (po blocích kvůli paměti)."""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        labels[start:start + block_size] = nearest_centroids(block, centroids, spherical)
+    return labels
+
+
+def contains_rows(rows, candidates):
+    """Maska kandidátů, kteří patří do rows (slice nebo seřazené pole indexů)."""
+    if isinstance(rows, slice):
+        return (candidates >= rows.start) & (candidates < rows.stop)
+    positions = np.searchsorted(rows, candidates)
+    found = positions < len(rows)
+    found[found] = rows[positions[found]] == candidates[found]
+    return found
+
+
+class IVFIndex:
+    """Inverted-file index nad maticí embeddingů"""
+
+    def __init__(self, matrix, centroids, offsets, rows, nprobe=8):
+        """
+        Parametry:
+        - matrix: (n, d) normalizovaná matice embeddingů
+        - centroids: (n_lists, d) normalizované centroidy
+        - offsets, rows: posting listy ve formátu CSR -
+          řádky oddílu i jsou rows[offsets[i]:offsets[i + 1]]
+        - nprobe: kolik nejbližších oddílů prohledat
+        """
+        self.matrix = matrix
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, nprobe=8, iterations=100, seed=42):
+        """
+        Natrénuje centroidy a rozdělí chunky do posting listů.
+        Výchozí n_lists = sqrt(n).
+        """
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(matrix.shape[0])))
+
+        centroids = minibatch_kmeans(matrix, n_lists, iterations=iterations, seed=seed)
+        labels = assign_to_centroids(matrix, centroids)
+
+        rows = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+
+        return cls(matrix, centroids, offsets, rows, nprobe=nprobe)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def list_sizes(self):
+        return np.diff(self.offsets)
+
+    def search(self, query_embedding, top_k=5, nprobe=None, rows=None):
+        """
+        Najde přibližně top_k nejpodobnějších chunků v nprobe nejbližších oddílech.
+
+        Parametry:
+        - rows: volitelně omezení na podmnožinu řádků (slice nebo seřazené pole
+          indexů) - z posting listů se berou jen ty; dokud jich není top_k,
+          prohledávají se další oddíly (filtr nesmí vrátit méně výsledků)
+
+        Vrací (rows, scores) - indexy řádků a jejich similarity, sestupně.
+        """
+        query = normalize_vector(query_embedding)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+
+        parts = []
+        found = 0
+        for probed, i in enumerate(np.argsort(-(self.centroids @ query), kind="stable"), 1):
+            postings = self.rows[self.offsets[i]:self.offsets[i + 1]]
+            if rows is not None:
+                postings = postings[contains_rows(rows, postings)]
+            parts.append(postings)
+            found += len(postings)
+            if probed >= nprobe and found >= top_k:
+                break
+        candidates = np.concatenate(parts)
+
+        scores = self.matrix[candidates] @ query
+        best = top_k_indices(scores, top_k)
+        return candidates[best].astype(np.int64), scores[best]
+
+    def save(self, path, version=""):
+        """
+        Uloží centroidy a posting listy (bez vektorů) do .npz souboru.
+        version = verze úložiště (index_version), ke které index patří.
+        """
+        np.savez(path, centroids=self.centroids, offsets=self.offsets,
+                 rows=self.rows, nprobe=np.array(self.nprobe), version=np.array(version))
+
+    @classmethod
+    def load(cls, path, matrix, nprobe=None, version=None):
+        """
+        Načte index z .npz a napojí ho na matici embeddingů.
+        version = očekávaná verze úložiště - jiná znamená, že posting listy ukazují na jiné řádky.
+        """
+        data = np.load(path)
+        saved_version = str(data["version"]) if "version" in data.files else ""
+        if version is not None and saved_version != version:
+            raise ValueError(f"IVF index ({path}) byl postaven pro jinou verzi úložiště")
+        if len(data["rows"]) != matrix.shape[0]:
+            raise ValueError(f"IVF index ({len(data['rows'])} řádků) neodpovídá matici ({matrix.shape[0]} řádků)")
+        return cls(matrix, data["centroids"], data["offsets"], data["rows"],
+                   nprobe=nprobe or int(data["nprobe"]))
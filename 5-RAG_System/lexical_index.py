@@ -0,0 +1,187 @@
+"""
+FLEURDIN AI - LEXICAL INDEX (BM25)
+==================================
+Invertovaný index nad textem chunků pro hybridní vyhledávání.
+
+MiniLM si neporadí se vzácnými slovenskými názvy bylin a přesnými
+názvy potíží - BM25 je najde doslova. Výsledky se spojí s dense
+vyhledáváním přes reciprocal-rank fusion (RRF).
+
+Tokenizace pro češtinu/slovenštinu:
+- malá písmena bez diakritiky ("Púpava" = "pupava")
+- prefixový stemming (prvních STEM_LENGTH znaků) pro skloňované tvary
+- bez krátkých slov a nejběžnějších spojek/předložek
+
+Postings jsou kompaktní pole (CSR): term → (řádky int32, tf uint16).
+"""
+
+import re
+
+import numpy as np
+
+from entity_matcher import fold_text
+from vector_search import top_k_indices
+
+
+BM25_SUFFIX = ".bm25.npz"
+STEM_LENGTH = 6
+
+STOPWORDS = {
+    "a", "i", "k", "o", "s", "u", "v", "z", "na", "do", "od", "po", "pro", "pri", "pred",
+    "ze", "se", "si", "je", "sa", "to", "ta", "ten", "ako", "jak", "co", "ci", "by", "bych",
+    "mi", "me", "mne", "aby", "ale", "nebo", "alebo", "tak", "take", "tiez", "jsou", "su",
+    "byt", "mam", "ma", "bys", "pod", "nad", "za", "pak", "jeho", "jej", "ich", "jejich"
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def chunk_document(chunk):
+    """Text chunku pro lexikální index - název entity + text."""
+    name = chunk.get("entity_name") or chunk.get("name") or ""
+    return f"{name}\n{chunk.get('text', '')}"
+
+
+def tokenize(text):
+    """Rozdělí text na normalizované tokeny (bez diakritiky, stemming)."""
+    tokens = []
+    for token in _TOKEN_RE.findall(fold_text(text)):
+        if len(token) < 2 or token in STOPWORDS or token.isdigit():
+            continue
+        tokens.append(token[:STEM_LENGTH])
+    return tokens
+
+
+class BM25Builder:
+    """Inkrementální stavba indexu - dokumenty se přidávají po jednom"""
+
+    def __init__(self):
+        self.vocabulary = {}     # term -> id
+        self.postings = []       # id termu -> [(řádek, tf)]
+        self.doc_lengths = []
+
+    def add(self, text):
+        """Přidá dokument (řádek = pořadí přidání)."""
+        row = len(self.doc_lengths)
+        tokens = tokenize(text)
+        self.doc_lengths.append(len(tokens))
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        for token, tf in counts.items():
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                term_id = len(self.postings)
+                self.vocabulary[token] = term_id
+                self.postings.append([])
+            self.postings[term_id].append((row, tf))
+        return row
+
+    def build(self, k1=1.5, b=0.75):
+        """Zabalí postings do kompaktních polí."""
+        terms = list(self.vocabulary)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self.postings[self.vocabulary[term]]) for term in terms], out=offsets[1:])
+
+        rows = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            postings = self.postings[self.vocabulary[term]]
+            rows[offsets[i]:offsets[i + 1]] = [row for row, _ in postings]
+            tfs[offsets[i]:offsets[i + 1]] = [min(tf, 65535) for _, tf in postings]
+
+        return BM25Index(terms, offsets, rows, tfs, np.array(self.doc_lengths, dtype=np.int32), k1=k1, b=b)
+
+
+class BM25Index:
+    """BM25 skórování nad kompaktními postings"""
+
+    def __init__(self, terms, offsets, rows, tfs, doc_lengths, k1=1.5, b=0.75):
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        n = len(doc_lengths)
+        doc_freq = np.diff(offsets)
+        self.idf = np.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        self.avg_length = float(doc_lengths.mean()) if n else 0.0
+
+    @classmethod
+    def from_texts(cls, texts, k1=1.5, b=0.75):
+        builder = BM25Builder()
+        for text in texts:
+            builder.add(text)
+        return builder.build(k1=k1, b=b)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def search(self, query_text, top_k=5, mask=None):
+        """
+        Najde top_k chunků podle BM25.
+
+        Parametry:
+        - mask: volitelná bool maska povolených řádků
+
+        Vrací (rows, scores) - jen chunky s alespoň jedním termem dotazu.
+        """
+        term_ids = [self.terms[token] for token in set(tokenize(query_text)) if token in self.terms]
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate([self.rows[self.offsets[t]:self.offsets[t + 1]] for t in term_ids])
+        tfs = np.concatenate([self.tfs[self.offsets[t]:self.offsets[t + 1]] for t in term_ids]).astype(np.float32)
+        idf = np.repeat(self.idf[term_ids], np.diff(self.offsets)[term_ids])
+
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[rows] / max(self.avg_length, 1e-9))
+        contributions = idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        # Součet příspěvků po řádcích jen pro dotčené chunky
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions).astype(np.float32)
+
+        if mask is not None:
+            allowed = mask[candidates]
+            candidates, scores = candidates[allowed], scores[allowed]
+
+        best = top_k_indices(scores, top_k)
+        return candidates[best].astype(np.int64), scores[best]
+
+    def save(self, path):
+        terms = sorted(self.terms, key=self.terms.get)
+        np.savez(path, terms=np.array(terms), offsets=self.offsets, rows=self.rows, tfs=self.tfs,
+                 doc_lengths=self.doc_lengths, params=np.array([self.k1, self.b]))
+
+    @classmethod
+    def load(cls, path, count=None):
+        """
+        Parametry:
+        - count: očekávaný počet chunků (řádků úložiště) - kontrola, že index k úložišti patří
+        """
+        data = np.load(path)
+        if count is not None and len(data["doc_lengths"]) != count:
+            raise ValueError(f"BM25 index ({len(data['doc_lengths'])} chunků) neodpovídá úložišti ({count} chunků)")
+        k1, b = data["params"].tolist()
+        return cls(data["terms"].tolist(), data["offsets"], data["rows"], data["tfs"],
+                   data["doc_lengths"], k1=k1, b=b)
+
+
+def reciprocal_rank_fusion(rankings, k=60, return_scores=False):
+    """
+    Spojí několik seřazených seznamů řádků (RRF): skóre = Σ 1 / (k + pořadí).
+    Vrací řádky seřazené podle spojeného skóre (s return_scores i skóre).
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(np.asarray(ranking).tolist()):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank + 1)
+    rows = np.array(sorted(fused, key=fused.get, reverse=True), dtype=np.int64)
+    if return_scores:
+        return rows, np.array([fused[row] for row in rows.tolist()], dtype=np.float32)
+    return rows
@@ -0,0 +1,153 @@
+"""
+FLEURDIN AI - PASSAGE STITCHER
+==============================
+Spojí nalezené části stejného textu do souvislých pasáží.
+
+Dlouhé texty se dělí na chunky s překryvem (split_into_chunks,
+_create_fixed_size_chunks: 1200 znaků, overlap 200) a id chunků mají tvar
+<parent>_part_<N>. Když vyhledávání vrátí víc částí stejného rodiče:
+- sousední části se slijí do jedné pasáže bez zdvojeného překryvu
+- pasáž useknutá uprostřed věty se doplní ze sousední části (jen do konce věty)
+
+PartIndex mapuje rodiče na řádky seřazené podle čísla části, soused
+se tak najde v O(1).
+"""
+
+import re
+
+
+PART_ID_RE = re.compile(r"^(?P<parent>.+)_part_(?P<part>\d+)$")
+SENTENCE_END_RE = re.compile(r"[.!?…](?=\s|$)")
+SENTENCE_START_RE = re.compile(r"[.!?…]\s+")
+
+CHUNK_OVERLAP = 200       # Překryv z chunkingu - zkusí se jako první
+MAX_OVERLAP = 600         # Delší překryv se nehledá
+NEIGHBOUR_MAX_CHARS = 300 # Kolik znaků ze sousední části max. doplnit
+
+
+def split_part_id(chunk_id):
+    """'book1_12_part_3' → ('book1_12', 3), jinak (None, None)."""
+    match = PART_ID_RE.match(str(chunk_id))
+    if match is None:
+        return None, None
+    return match.group("parent"), int(match.group("part"))
+
+
+def overlap_length(left, right):
+    """Délka nejdelšího konce left, kterým začíná right (zdvojený překryv)."""
+    if len(left) >= CHUNK_OVERLAP and left.endswith(right[:CHUNK_OVERLAP]):
+        return CHUNK_OVERLAP
+    for length in range(min(len(left), len(right), MAX_OVERLAP), 0, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+def ends_sentence(text):
+    return text.rstrip().endswith((".", "!", "?", "…"))
+
+
+class PartIndex:
+    """Rodič → řádky chunků seřazené podle části"""
+
+    def __init__(self, chunks, parent_rows):
+        """
+        Parametry:
+        - chunks: všechny chunky (index = řádek)
+        - parent_rows: {rodič: [řádek části 1, části 2, ...]} (None = chybí)
+        """
+        self.chunks = chunks
+        self.parent_rows = parent_rows
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        parent_rows = {}
+        for row, chunk in enumerate(chunks):
+            parent, part = split_part_id(chunk["id"])
+            if parent is None:
+                continue
+            rows = parent_rows.setdefault(parent, [])
+            if len(rows) < part:
+                rows.extend([None] * (part - len(rows)))
+            rows[part - 1] = row
+        return cls(chunks, parent_rows)
+
+    def part_chunk(self, parent, part):
+        """Chunk dané části rodiče, nebo None."""
+        rows = self.parent_rows.get(parent)
+        if rows is None or not 1 <= part <= len(rows) or rows[part - 1] is None:
+            return None
+        return self.chunks[rows[part - 1]]
+
+    def _extend_start(self, parent, first_part, text):
+        """Doplní začátek pasáže z předchozí části (od začátku přerušené věty)."""
+        previous = self.part_chunk(parent, first_part - 1)
+        if previous is None:
+            return text
+        head = previous["text"][:len(previous["text"]) - overlap_length(previous["text"], text)]
+        if ends_sentence(head):
+            return text
+        window = head[-NEIGHBOUR_MAX_CHARS:]
+        starts = list(SENTENCE_START_RE.finditer(window))
+        if not starts:
+            return text
+        return window[starts[-1].end():] + text
+
+    def _extend_end(self, parent, last_part, text):
+        """Doplní konec pasáže z následující části (do konce přerušené věty)."""
+        following = self.part_chunk(parent, last_part + 1)
+        if following is None or ends_sentence(text):
+            return text
+        tail = following["text"][overlap_length(text, following["text"]):]
+        end = SENTENCE_END_RE.search(tail[:NEIGHBOUR_MAX_CHARS])
+        if end is None:
+            return text
+        return text + tail[:end.end()]
+
+    def stitch(self, docs, extend_boundaries=True):
+        """
+        Spojí části stejného rodiče do pasáží (v pořadí relevance prvního zásahu).
+        Chunky bez částí projdou beze změny, duplicitní id se zahodí.
+        Pasáž nese id první části a seznam spojených částí v 'parts'.
+        """
+        groups = {}     # klíč -> seznam chunků
+        order = []
+        for doc in docs:
+            parent, _ = split_part_id(doc["id"])
+            key = parent if parent is not None else ("doc", doc["id"])
+            if key not in groups:
+                groups[key] = []
+                order.append(key)
+            if all(existing["id"] != doc["id"] for existing in groups[key]):
+                groups[key].append(doc)
+
+        passages = []
+        for key in order:
+            if isinstance(key, tuple):
+                passages.append(groups[key][0])
+                continue
+
+            hits = sorted(groups[key], key=lambda doc: split_part_id(doc["id"])[1])
+            runs = [[hits[0]]]
+            for doc in hits[1:]:
+                if split_part_id(doc["id"])[1] == split_part_id(runs[-1][-1]["id"])[1] + 1:
+                    runs[-1].append(doc)
+                else:
+                    runs.append([doc])
+
+            for run in runs:
+                text = run[0]["text"]
+                for doc in run[1:]:
+                    text += doc["text"][overlap_length(text, doc["text"]):]
+
+                parts = [split_part_id(doc["id"])[1] for doc in run]
+                if extend_boundaries:
+                    text = self._extend_start(key, parts[0], text)
+                    text = self._extend_end(key, parts[-1], text)
+
+                passage = dict(run[0])
+                passage["text"] = text
+                passage["parts"] = parts
+                passages.append(passage)
+
+        return passages
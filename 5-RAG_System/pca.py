@@ -0,0 +1,89 @@
+"""
+FLEURDIN AI - PCA PROJEKCE
+==========================
+Volitelné snížení dimenze uložených embeddingů (např. 384 → 128).
+
+Projekce se fituje na matici chunků a stejná se aplikuje na embedding
+dotazu (HuggingFaceEmbeddings.embed_query). Po projekci se vektory znovu
+normalizují, takže similarity zůstává dot product.
+"""
+
+import numpy as np
+
+from vector_search import normalize_rows, normalize_vector
+
+
+PCA_SUFFIX = ".pca.npz"
+
+
+class PCAProjection:
+    """Lineární projekce na hlavní komponenty"""
+
+    def __init__(self, mean, components, explained_variance_ratio=None):
+        """
+        Parametry:
+        - mean: (d,) průměr trénovací matice
+        - components: (k, d) hlavní komponenty (řádky)
+        - explained_variance_ratio: (k,) podíl vysvětleného rozptylu
+        """
+        self.mean = mean
+        self.components = components
+        self.explained_variance_ratio = explained_variance_ratio
+
+    @classmethod
+    def fit(cls, matrix, dimensions, block_size=65536):
+        """
+        Spočítá hlavní komponenty z kovarianční matice (d x d),
+        matice chunků se čte po blocích.
+        """
+        n, d = matrix.shape
+        if not 0 < dimensions <= d:
+            raise ValueError(f"Cílová dimenze musí být 1..{d}, ne {dimensions}")
+
+        total = np.zeros(d, dtype=np.float64)
+        gram = np.zeros((d, d), dtype=np.float64)
+        for start in range(0, n, block_size):
+            block = np.asarray(matrix[start:start + block_size], dtype=np.float64)
+            total += block.sum(axis=0)
+            gram += block.T @ block
+
+        mean = total / n
+        covariance = gram / n - np.outer(mean, mean)
+
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:dimensions]
+        ratio = eigenvalues[order] / eigenvalues.sum()
+
+        return cls(mean.astype(np.float32),
+                   eigenvectors[:, order].T.astype(np.float32),
+                   ratio.astype(np.float32))
+
+    @property
+    def dimensions(self):
+        return self.components.shape[0]
+
+    def transform(self, matrix, block_size=65536):
+        """Promítne matici a znovu normalizuje řádky."""
+        projected = np.empty((matrix.shape[0], self.dimensions), dtype=np.float32)
+        for start in range(0, matrix.shape[0], block_size):
+            block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+            projected[start:start + block_size] = (block - self.mean) @ self.components.T
+        return normalize_rows(projected)
+
+    def transform_query(self, query_embedding):
+        """
+        Promítne embedding dotazu stejnou projekcí jako chunky.
+        mean je spočítaný z normalizovaných řádků - dotaz se normalizuje
+        před odečtením (embed_query MiniLM vrací nenormalizované vektory).
+        """
+        query = normalize_vector(np.asarray(query_embedding, dtype=np.float32).ravel())
+        return normalize_vector((query - self.mean) @ self.components.T)
+
+    def save(self, path):
+        np.savez(path, mean=self.mean, components=self.components,
+                 explained_variance_ratio=self.explained_variance_ratio)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["mean"], data["components"], data["explained_variance_ratio"])
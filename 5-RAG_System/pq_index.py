@@ -0,0 +1,129 @@
+"""
+FLEURDIN AI - PRODUCT QUANTIZATION INDEX
+========================================
+Komprimovaný index pro velké korpusy (miliony chunků).
+
+Vektor (384 dim) se rozdělí na m subprostorů, každý subprostor má vlastní
+codebook s ks centroidy (k-means). Chunk se uloží jako m bajtů
+(index nejbližšího centroidu v každém subprostoru) - např. m=16 → 16 B/chunk.
+
+Dotaz se skóruje asymetricky (ADC): pro každý subprostor se předpočítá
+tabulka q_j · centroid, skóre chunku je součet m vyhledání v tabulkách.
+"""
+
+import numpy as np
+
+from ivf_index import assign_to_centroids, minibatch_kmeans
+from vector_search import normalize_vector, take_rows, top_k_indices
+
+
+PQ_SUFFIX = ".pq.npz"
+
+
+class PQIndex:
+    """Product-quantization index s ADC skórováním"""
+
+    def __init__(self, codebooks, codes, matrix=None, rescore=0):
+        """
+        Parametry:
+        - codebooks: (m, ks, d/m) centroidy pro každý subprostor
+        - codes: (m, n) uint8 kódy po subprostorech (sloupec = chunk)
+        - matrix: volitelně float32 matice pro přeskórování shortlistu
+        - rescore: kolik kandidátů přeskórovat ve float32 (0 = čisté PQ)
+        """
+        self.codebooks = codebooks
+        self.codes = codes
+        self.matrix = matrix
+        self.rescore = rescore
+
+    @classmethod
+    def build(cls, matrix, m=16, ks=256, iterations=100, seed=42, matrix_for_rescore=None, rescore=0):
+        """
+        Natrénuje codebooky a zakóduje všechny chunky.
+
+        Parametry:
+        - matrix: (n, d) normalizovaná matice, d musí být dělitelné m
+        - m: počet subprostorů (= bajtů na chunk)
+        - ks: počet centroidů v subprostoru (max 256 kvůli uint8)
+        """
+        n, d = matrix.shape
+        if d % m != 0:
+            raise ValueError(f"Dimenze {d} není dělitelná počtem subprostorů {m}")
+        ks = min(ks, 256, n)
+        sub_dim = d // m
+
+        codebooks = np.empty((m, ks, sub_dim), dtype=np.float32)
+        codes = np.empty((m, n), dtype=np.uint8)
+        for j in range(m):
+            subspace = np.ascontiguousarray(matrix[:, j * sub_dim:(j + 1) * sub_dim], dtype=np.float32)
+            codebooks[j] = minibatch_kmeans(subspace, ks, iterations=iterations, seed=seed + j, spherical=False)
+            codes[j] = assign_to_centroids(subspace, codebooks[j], spherical=False)
+
+        return cls(codebooks, codes, matrix=matrix_for_rescore, rescore=rescore)
+
+    def __len__(self):
+        return self.codes.shape[1]
+
+    @property
+    def m(self):
+        return self.codebooks.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.codebooks.nbytes
+
+    def lookup_tables(self, query):
+        """(m, ks) tabulka similarit části dotazu s centroidy subprostoru."""
+        sub_queries = query.reshape(self.m, -1)
+        return np.einsum("mkd,md->mk", self.codebooks, sub_queries)
+
+    def adc_scores(self, query, rows=None):
+        """Přibližná similarity všech chunků (nebo jen rows) - m vyhledání v tabulkách."""
+        tables = self.lookup_tables(query)
+        codes = self.codes if rows is None else self.codes[:, rows]
+        scores = np.zeros(codes.shape[1], dtype=np.float32)
+        for j in range(self.m):
+            scores += tables[j][codes[j]]
+        return scores
+
+    def search(self, query_embedding, top_k=5, rescore=None, rows=None):
+        """
+        Najde přibližně top_k nejpodobnějších chunků.
+
+        Parametry:
+        - rows: volitelně omezení na podmnožinu řádků (slice nebo pole indexů,
+          jako VectorIndex.search) - skórují se jen ty, ostatní se nečtou
+
+        Vrací (rows, scores) - indexy řádků a jejich similarity, sestupně.
+        """
+        query = normalize_vector(query_embedding)
+        scores = self.adc_scores(query, rows)
+
+        rescore = self.rescore if rescore is None else rescore
+        if self.matrix is None or not rescore:
+            best = top_k_indices(scores, top_k)
+            return take_rows(rows, best), scores[best]
+
+        shortlist = np.sort(take_rows(rows, top_k_indices(scores, max(rescore, top_k))))
+        exact = np.asarray(self.matrix[shortlist]) @ query
+        best = top_k_indices(exact, top_k)
+        return shortlist[best], exact[best]
+
+    def save(self, path, version=""):
+        """version = verze úložiště (index_version), ke které kódy patří."""
+        np.savez(path, codebooks=self.codebooks, codes=self.codes, version=np.array(version))
+
+    @classmethod
+    def load(cls, path, matrix=None, rescore=0, version=None):
+        """
+        Parametry:
+        - matrix: volitelná float32 matice pro přeskórování (musí mít stejný počet řádků)
+        - version: očekávaná verze úložiště - jiná znamená, že kódy patří k jiným řádkům
+        """
+        data = np.load(path)
+        saved_version = str(data["version"]) if "version" in data.files else ""
+        if version is not None and saved_version != version:
+            raise ValueError(f"PQ index ({path}) byl postaven pro jinou verzi úložiště")
+        if matrix is not None and data["codes"].shape[1] != matrix.shape[0]:
+            raise ValueError(f"PQ kódy ({data['codes'].shape[1]} chunků) neodpovídají matici ({matrix.shape[0]} řádků)")
+        return cls(data["codebooks"], data["codes"], matrix=matrix, rescore=rescore)
@@ -0,0 +1,123 @@
+"""
+FLEURDIN AI - INT8 KVANTIZACE
+=============================
+Skalárně kvantizovaná matice embeddingů (int8, 4x méně paměti než float32).
+
+Každá dimenze má vlastní offset (minimum) a scale (rozsah / 255):
+    x ≈ (code + 128) * scale + offset
+
+Hrubé skórování běží nad int8 maticí (v RAM), jen krátký seznam kandidátů
+se přepočítá přesně nad float32 maticí (memmap na disku).
+"""
+
+import numpy as np
+
+from vector_search import normalize_vector, take_rows, top_k_indices
+
+
+INT8_SUFFIX = ".int8.npz"
+
+
+def fit_int8(matrix, block_size=65536):
+    """Spočítá offset a scale pro každou dimenzi (po blocích kvůli paměti)."""
+    lows = []
+    highs = []
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        lows.append(block.min(axis=0))
+        highs.append(block.max(axis=0))
+
+    offset = np.min(lows, axis=0).astype(np.float32)
+    scale = ((np.max(highs, axis=0) - offset) / 255).astype(np.float32)
+    scale[scale == 0] = 1.0
+    return scale, offset
+
+
+def quantize_int8(matrix, scale, offset, block_size=65536):
+    """Převede float matici na int8 kódy."""
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        scaled = np.rint((block - offset) / scale) - 128
+        codes[start:start + block_size] = np.clip(scaled, -128, 127)
+    return codes
+
+
+class Int8Index:
+    """Hrubé hledání nad int8 kódy + přesné přeskórování kandidátů"""
+
+    def __init__(self, codes, scale, offset, matrix=None, rescore=100, block_size=16384):
+        """
+        Parametry:
+        - codes: (n, d) int8 kódy
+        - scale, offset: kvantizační parametry po dimenzích
+        - matrix: float32 normalizovaná matice pro přeskórování (None = bez něj)
+        - rescore: kolik kandidátů z hrubého hledání přeskórovat ve float32
+        - block_size: po kolika řádcích převádět kódy při skórování
+        """
+        self.codes = codes
+        self.scale = scale
+        self.offset = offset
+        self.matrix = matrix
+        self.rescore = rescore
+        self.block_size = block_size
+
+    @classmethod
+    def build(cls, matrix, rescore=100):
+        scale, offset = fit_int8(matrix)
+        return cls(quantize_int8(matrix, scale, offset), scale, offset, matrix=matrix, rescore=rescore)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scale.nbytes + self.offset.nbytes
+
+    def coarse_scores(self, query, rows=None):
+        """
+        Přibližná similarity ze int8 kódů (všech řádků, nebo jen rows).
+        q·x = (code + 128)·(q * scale) + q·offset
+        """
+        weights = query * self.scale
+        bias = float(query @ self.offset + 128 * weights.sum())
+
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.block_size):
+            block = codes[start:start + self.block_size].astype(np.float32)
+            scores[start:start + self.block_size] = block @ weights
+        return scores + bias
+
+    def search(self, query_embedding, top_k=5, rescore=None, rows=None):
+        """
+        Najde top_k chunků - hrubě nad int8, přesně nad shortlistem.
+
+        Parametry:
+        - rows: volitelně omezení na podmnožinu řádků (slice nebo pole indexů,
+          jako VectorIndex.search) - skórují se jen ty, ostatní se nečtou
+
+        Vrací (rows, scores) - indexy řádků a jejich similarity, sestupně.
+        """
+        query = normalize_vector(query_embedding)
+        scores = self.coarse_scores(query, rows)
+
+        if self.matrix is None:
+            best = top_k_indices(scores, top_k)
+            return take_rows(rows, best), scores[best]
+
+        # Seřazené řádky = sekvenční čtení z memmap
+        shortlist = np.sort(take_rows(rows, top_k_indices(scores, max(rescore or self.rescore, top_k))))
+        exact = np.asarray(self.matrix[shortlist]) @ query
+        best = top_k_indices(exact, top_k)
+        return shortlist[best], exact[best]
+
+    def save(self, path):
+        np.savez(path, codes=self.codes, scale=self.scale, offset=self.offset)
+
+    @classmethod
+    def load(cls, path, matrix=None, rescore=100):
+        data = np.load(path)
+        if matrix is not None and data["codes"].shape != matrix.shape:
+            raise ValueError(f"Int8 kódy {data['codes'].shape} neodpovídají matici {matrix.shape}")
+        return cls(data["codes"], data["scale"], data["offset"], matrix=matrix, rescore=rescore)
@@ -0,0 +1,126 @@
+"""
+FLEURDIN AI - QUERY EMBEDDING CACHE
+===================================
+LRU/TTL cache embeddingů dotazů - opakované dotazy (spánek, stres,
+trávení...) nemusí znovu přes MiniLM.
+
+Klíč = (název modelu, normalizovaný text dotazu).
+Volitelně se cache ukládá na disk (.npz), takže restart začíná s teplou cache.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_query_text(text):
+    """Sjednotí text dotazu - Unicode NFC, malá písmena, mezery."""
+    text = unicodedata.normalize("NFC", text).lower().strip()
+    return re.sub(r"\s+", " ", text)
+
+
+class QueryEmbeddingCache:
+    """Omezená LRU cache embeddingů s TTL a počítadly hit/miss"""
+
+    def __init__(self, model_name, maxsize=1024, ttl=None, path=None):
+        """
+        Parametry:
+        - model_name: název embedding modelu (součást klíče)
+        - maxsize: max. počet uložených dotazů (nejdéle nepoužité se vyhodí)
+        - ttl: platnost záznamu v sekundách (None = bez expirace)
+        - path: volitelný .npz soubor pro uložení mezi spuštěními
+        """
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+
+        self.entries = OrderedDict()    # klíč -> (vektor, čas vložení)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()    # Souběžná sezení (async graf) sahají na cache z více vláken
+
+        if self.path and self.path.exists():
+            self.load()
+
+    def _key(self, text):
+        return (self.model_name, normalize_query_text(text))
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, text):
+        """Vrátí uložený embedding, nebo None (a započítá hit/miss)."""
+        key = self._key(text)
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, text, embedding, created=None):
+        key = self._key(text)
+        with self.lock:
+            self.entries[key] = (np.asarray(embedding, dtype=np.float32), created or time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, text, compute):
+        """Vrátí embedding z cache, nebo ho spočítá funkcí compute(text) a uloží."""
+        embedding = self.get(text)
+        if embedding is None:
+            embedding = np.asarray(compute(text), dtype=np.float32)
+            self.put(text, embedding)
+        return embedding
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def save(self, path=None):
+        """Uloží platné záznamy tohoto modelu do .npz (v pořadí LRU)."""
+        path = Path(path) if path else self.path
+        if path is None:
+            return
+
+        items = [(key[1], vector, created) for key, (vector, created) in self.entries.items()
+                 if key[0] == self.model_name and not self._expired(created)]
+        if not items:
+            return
+
+        np.savez(
+            path,
+            model_name=np.array(self.model_name),
+            texts=np.array([text for text, _, _ in items]),
+            vectors=np.stack([vector for _, vector, _ in items]),
+            created=np.array([created for _, _, created in items], dtype=np.float64)
+        )
+
+    def load(self, path=None):
+        """Načte záznamy z .npz - jen pro stejný model a jen neexpirované."""
+        path = Path(path) if path else self.path
+        data = np.load(path)
+        if str(data["model_name"]) != self.model_name:
+            return
+
+        for text, vector, created in zip(data["texts"].tolist(), data["vectors"], data["created"].tolist()):
+            if not self._expired(created):
+                self.put(text, vector, created)
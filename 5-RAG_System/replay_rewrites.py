@@ -0,0 +1,135 @@
+"""
+FLEURDIN AI - REPLAY PŘEPISŮ DOTAZŮ
+===================================
+Přehraje otázky z conversation_log_*.txt přes rozhodování PrepareQueryNode
+a spočítá, kolik volání LLM (a milisekund) ušetří:
+- rychlá cesta pro zmíněné entity (přesná i fuzzy shoda názvu)
+- bypass krátkých dotazů z klíčových slov
+- cache přepisů (opakované otázky)
+a kolik odpověď nečeká díky spekulativnímu hledání (na přepis se čeká
+jen REWRITE_GRACE, pozdní přepis se uloží do cache) - a kolik přepisů
+za tu cenu nestihne spojení s výsledkem pro původní otázku.
+
+Latence jednoho přepisu se bere z rewrite_cache.json (změřené přepisy),
+jinak DEFAULT_REWRITE_MS. LLM se při replayi nevolá.
+
+Spuštění:
+    python replay_rewrites.py [složka s logy]
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+
+from embedding_store import STORE_NAME, load_store, store_exists
+from entity_matcher import EntityMatcher
+from rewrite_cache import RewriteCache, is_keyword_query
+from trigram_index import TrigramIndex
+
+
+# Konfigurace
+LOG_PATTERN = "conversation_log_*.txt"
+REWRITE_CACHE_FILE = "rewrite_cache.json"
+DEFAULT_REWRITE_MS = 900    # Typická latence přepisu gpt-4o-mini, pokud není změřená
+ENTITY_FUZZY_THRESHOLD = 0.6
+REWRITE_GRACE = None        # s - stejné jako v RAG_agents_script.py (None = percentil latencí)
+REWRITE_GRACE_PERCENTILE = 50
+REWRITE_GRACE_DEFAULT = 1.2
+
+
+print("="*70)
+print("🔁 FLEURDIN AI - REPLAY PŘEPISŮ DOTAZŮ")
+print("="*70)
+
+
+def load_questions(log_dir):
+    """Otázky ze všech logů konverzací (v pořadí souborů a zápisu)."""
+    questions = []
+    for path in sorted(Path(log_dir).glob(LOG_PATTERN)):
+        text = path.read_text(encoding="utf-8")
+        questions += [q.strip() for q in re.findall(r"^Q: (.+)$", text, flags=re.MULTILINE) if q.strip()]
+    return questions
+
+
+def load_chunks():
+    """Chunky pro detekci entit (None, pokud data nejsou k dispozici)."""
+    if store_exists(STORE_NAME):
+        return load_store(STORE_NAME).chunks
+    json_path = Path("chunked_data_with_embeddings.json")
+    if json_path.exists():
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)["chunks"]
+    return None
+
+
+def main(log_dir="."):
+    questions = load_questions(log_dir)
+    if not questions:
+        print(f"\n❌ Žádné otázky v {Path(log_dir).resolve()}/{LOG_PATTERN}")
+        return
+
+    chunks = load_chunks()
+    if chunks is None:
+        print("\n⚠️  Chunky nejsou k dispozici - rychlá cesta pro entity se nepočítá")
+        entity_matcher = fuzzy_index = None
+    else:
+        entity_matcher = EntityMatcher.from_chunks(chunks)
+        fuzzy_index = TrigramIndex.from_chunks(chunks)
+
+    measured = grace_ms = measured_cache = None
+    if Path(REWRITE_CACHE_FILE).exists():
+        measured_cache = RewriteCache(path=REWRITE_CACHE_FILE)
+        measured = measured_cache.mean_latency_ms()
+        grace_ms = measured_cache.latency_percentile(REWRITE_GRACE_PERCENTILE)
+    rewrite_ms = measured or DEFAULT_REWRITE_MS
+    if REWRITE_GRACE is not None:
+        grace_ms = REWRITE_GRACE * 1000
+    elif grace_ms is None:
+        grace_ms = REWRITE_GRACE_DEFAULT * 1000
+
+    # Čerstvá cache - replay začíná stejně jako nový proces bez rewrite_cache.json
+    cache = RewriteCache()
+    counts = {"entity": 0, "bypass": 0, "cache": 0, "llm": 0}
+
+    for question in questions:
+        if entity_matcher is not None and (
+                entity_matcher.match(question) or fuzzy_index.match(question, threshold=ENTITY_FUZZY_THRESHOLD)):
+            counts["entity"] += 1
+        elif is_keyword_query(question):
+            counts["bypass"] += 1
+        elif cache.get(question) is not None:
+            counts["cache"] += 1
+        else:
+            counts["llm"] += 1
+            cache.put(question, question)
+
+    total = len(questions)
+    saved = total - counts["llm"]
+    print(f"\n📂 Otázek v logech: {total}")
+    print(f"⏱️  Latence přepisu: {rewrite_ms:.0f} ms ({'změřená' if measured else 'odhad'})")
+    print("\n" + "-"*70)
+    print(f"  • rychlá cesta (entita):  {counts['entity']:5d}")
+    print(f"  • bypass (klíčová slova): {counts['bypass']:5d}")
+    print(f"  • cache přepisů:          {counts['cache']:5d}")
+    print(f"  • volání LLM:             {counts['llm']:5d}   (dříve {total})")
+    print("-"*70)
+    print(f"✅ Ušetřeno {saved} z {total} volání LLM ({saved / total:.0%}), "
+          f"průměrně {saved * rewrite_ms / total:.0f} ms na požadavek")
+
+    # Zbylá volání LLM: se spekulativním hledáním se čeká nejvýš REWRITE_GRACE.
+    # Přepis, který limit nestihne, se do odpovědi nepromítne (jen do cache).
+    waited_ms = min(rewrite_ms, grace_ms)
+    speculative_saved = counts["llm"] * (rewrite_ms - waited_ms)
+    print(f"🏎️  Spekulativní hledání: u {counts['llm']} přepisů se čeká {waited_ms:.0f} ms místo "
+          f"{rewrite_ms:.0f} ms - dalších {speculative_saved / total:.0f} ms na požadavek")
+    latencies = [entry["latency_ms"] for entry in measured_cache.entries.values()
+                 if entry.get("latency_ms")] if measured_cache is not None else []
+    if latencies:
+        in_time = sum(latency <= grace_ms for latency in latencies) / len(latencies)
+        print(f"🔀 Přepis stihne limit {grace_ms:.0f} ms u {in_time:.0%} změřených přepisů "
+              f"(jen ty se spojí s výsledkem pro původní otázku)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,113 @@
+"""
+FLEURDIN AI - RERANKER
+======================
+Volitelné přeskórování kandidátů cross-encoderem (otázka + text chunku
+společně), přesnější než cosine similarity embeddingů.
+
+Cross-encoder běží na CPU, všechny páry jednou dávkou v pracovním vlákně.
+Pokud nestihne časový limit požadavku, volající dostane None a použije
+pořadí z vyhledávání - odpověď se kvůli rerankingu nikdy nezdrží víc
+než o limit.
+
+Dávka, která limit nestihla, v pracovním vlákně doběhne. Dokud vlákno
+pracuje (nebo ještě načítá model), další požadavky reranking rovnou
+přeskočí, místo aby čekaly ve frontě celý limit. Stejně se přeskočí
+dávka, která by podle naměřené rychlosti limit nestihla.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # vícejazyčný, ~120 MB
+PROBE_EVERY = 20    # po tolika přeskočeních (odhad nestihne limit) se rychlost změří znovu na pozadí
+
+
+class CrossEncoderReranker:
+    """Cross-encoder s líným načtením modelu a časovým limitem"""
+
+    def __init__(self, model_name=RERANK_MODEL, max_length=512, batch_size=32):
+        """
+        Parametry:
+        - model_name: cross-encoder z HuggingFace (sentence-transformers)
+        - max_length: max. tokenů páru otázka + chunk (delší se oříznou)
+        - batch_size: velikost dávky pro predict
+        """
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self._model = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._lock = threading.Lock()
+        self._pending = None            # poslední úloha ve vlákně (načtení modelu nebo dávka)
+        self.seconds_per_pair = None    # klouzavý průměr doby predict na jeden pár
+        self.skipped = 0                # přeskočení kvůli odhadu od posledního měření
+
+    def _load(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def warmup(self):
+        """Načte model na pozadí, aby první dotaz neplatil jeho načtení."""
+        with self._lock:
+            self._pending = self.executor.submit(self._load)
+            return self._pending
+
+    def scores(self, question, docs):
+        """Skóre relevance pro každý chunk (jedna dávka)."""
+        pairs = [(question, doc["text"]) for doc in docs]
+        model = self._load()
+        start = time.perf_counter()
+        scores = np.asarray(model.predict(pairs, batch_size=self.batch_size,
+                                          show_progress_bar=False), dtype=np.float32)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        previous = self.seconds_per_pair
+        self.seconds_per_pair = per_pair if previous is None else 0.7 * previous + 0.3 * per_pair
+        return scores
+
+    def busy(self):
+        """Pracovní vlákno ještě načítá model nebo počítá předchozí dávku."""
+        return self._pending is not None and not self._pending.done()
+
+    def rerank(self, question, docs, time_budget=None):
+        """
+        Seřadí chunky podle skóre cross-encoderu.
+
+        Parametry:
+        - time_budget: limit v sekundách (None = bez limitu)
+
+        Vrací (seřazené chunky, skóre), nebo None, pokud limit vypršel
+        nebo se reranking přeskočil (vlákno je obsazené / dávka by limit nestihla).
+        """
+        if not docs:
+            return [], np.empty(0, dtype=np.float32)
+
+        with self._lock:
+            if time_budget is not None:
+                # Úloha ve frontě za běžící dávkou by limit stejně nestihla
+                if self.busy():
+                    return None
+                estimate = self.seconds_per_pair
+                if estimate is not None and estimate * len(docs) > time_budget:
+                    self.skipped += 1
+                    if self.skipped >= PROBE_EVERY:
+                        # Změř rychlost znovu na pozadí - požadavek na výsledek nečeká
+                        self.skipped = 0
+                        self._pending = self.executor.submit(self.scores, question, docs)
+                    return None
+                self.skipped = 0
+            future = self._pending = self.executor.submit(self.scores, question, docs)
+
+        try:
+            scores = future.result(timeout=time_budget)
+        except TimeoutError:
+            # Výpočet doběhne na pozadí, výsledek se zahodí
+            return None
+
+        order = np.argsort(-scores, kind="stable")
+        return [docs[i] for i in order], scores[order]
@@ -0,0 +1,87 @@
+"""
+FLEURDIN AI - RESOURCES
+=======================
+Líné sdílené zdroje (LLM, embedding model, úložiště, indexy).
+
+Zdroj se zaregistruje jako funkce bez parametrů a vytvoří se až při
+prvním použití (resources.nazev), pak se drží v paměti. Každý zdroj má
+vlastní zámek - souběžná sezení ho nepostaví dvakrát a nezávislé zdroje
+se můžou stavět paralelně (warmup). U každého se měří doba inicializace.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyResources:
+    """Kontejner zdrojů inicializovaných při prvním použití"""
+
+    def __init__(self):
+        self._factories = {}
+        self._values = {}
+        self._locks = {}
+        self._local = threading.local()
+        self.timings = {}    # název -> doba inicializace v sekundách (bez závislostí)
+
+    def register(self, name, factory):
+        """
+        Parametry:
+        - name: název zdroje (přístup přes resources.name)
+        - factory: funkce bez parametrů, která zdroj vytvoří (smí sahat na jiné zdroje)
+        """
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        return factory
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name not in self._factories:
+            raise KeyError(f"Neznámý zdroj: {name}")
+
+        # Zásobník rozestavěných zdrojů ve vlákně - čas vnořených závislostí
+        # (i čekání na ně) se odečte, každý zdroj má v timings jen vlastní čas
+        stack = self._stack()
+        entered = time.perf_counter()
+        with self._locks[name]:
+            if name not in self._values:
+                stack.append(0.0)
+                start = time.perf_counter()
+                try:
+                    value = self._factories[name]()
+                finally:
+                    nested = stack.pop()
+                self.timings[name] = time.perf_counter() - start - nested
+                self._values[name] = value
+        if stack:
+            stack[-1] += time.perf_counter() - entered
+        return self._values[name]
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def is_loaded(self, name):
+        return name in self._values
+
+    def warmup(self, names=None, max_workers=4):
+        """
+        Postaví zdroje paralelně (výchozí = všechny registrované).
+        Vrátí celkovou dobu v sekundách.
+        """
+        names = list(self._factories) if names is None else list(names)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as executor:
+            for future in [executor.submit(self.get, name) for name in names]:
+                future.result()
+        return time.perf_counter() - start
@@ -0,0 +1,117 @@
+"""
+FLEURDIN AI - REWRITE CACHE
+===========================
+Cache přepisů dotazů (otázka → vylepšený dotaz pro vector DB) a levná
+heuristika, kdy přepis přes LLM vůbec nevolat.
+
+Cache je LRU, klíč = normalizovaný text otázky, ukládá se do JSONu
+mezi spuštěními. U každého záznamu je i latence přepisu, ze které
+replay_rewrites.py počítá ušetřený čas.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from entity_matcher import fold_text
+from query_cache import normalize_query_text
+
+
+BYPASS_MAX_WORDS = 4    # Krátké dotazy z klíčových slov se nepřepisují
+QUESTION_WORDS = {
+    "co", "jak", "jaky", "jake", "jaka", "proc", "kdy", "kde", "ktery", "ktere", "ktera", "cim", "kolik",
+    "ako", "aky", "ake", "aka", "preco", "kedy", "ktory", "ktore", "kolko",
+    "bys", "byste", "mi", "mne", "doporucis", "doporucte", "poradis", "poradte", "chtel", "chtela"
+}
+
+
+def is_keyword_query(question):
+    """
+    Dotaz z pár klíčových slov ("levandule spánek", "bolest hlavy olej") -
+    přepis by nic nezlepšil. Věty s otazníkem nebo tázacími slovy přepis dostanou.
+    """
+    if "?" in question:
+        return False
+    words = re.findall(r"\w+", fold_text(question))
+    return 0 < len(words) <= BYPASS_MAX_WORDS and not QUESTION_WORDS.intersection(words)
+
+
+class RewriteCache:
+    """Persistentní LRU cache přepsaných dotazů"""
+
+    def __init__(self, maxsize=2048, path=None):
+        """
+        Parametry:
+        - maxsize: max. počet uložených přepisů (nejdéle nepoužité se vyhodí)
+        - path: volitelný .json soubor pro uložení mezi spuštěními
+        """
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+
+        self.entries = OrderedDict()    # normalizovaná otázka -> {"query", "latency_ms", "created"}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if self.path and self.path.exists():
+            self.load()
+
+    def get(self, question):
+        """Uložený přepis, nebo None (a započítá hit/miss)."""
+        key = normalize_query_text(question)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["query"]
+
+    def put(self, question, query, latency_ms=None):
+        key = normalize_query_text(question)
+        with self.lock:
+            self.entries[key] = {"query": query, "latency_ms": latency_ms, "created": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def mean_latency_ms(self):
+        """Průměrná změřená latence přepisu (None, pokud není z čeho)."""
+        latencies = [entry["latency_ms"] for entry in self.entries.values() if entry.get("latency_ms")]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def latency_percentile(self, percentile=50):
+        """Percentil změřených latencí přepisu v ms (None, pokud není z čeho)."""
+        with self.lock:
+            latencies = sorted(entry["latency_ms"] for entry in self.entries.values() if entry.get("latency_ms"))
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def save(self, path=None):
+        path = Path(path) if path else self.path
+        if path is None or not self.entries:
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+
+    def load(self, path=None):
+        path = Path(path) if path else self.path
+        with open(path, "r", encoding="utf-8") as f:
+            for key, entry in json.load(f).items():
+                self.entries[key] = entry
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
@@ -0,0 +1,139 @@
+"""
+FLEURDIN AI - TEST PROMPT SIZE
+==============================
+Regresní test velikosti promptu AnswerNode (počet tokenů na požadavek).
+
+Hlídá, že do promptu nejdou embeddingy ani metadata chunků a že prompt
+nepřekročí strop i pro nejdelší chunky. Pro srovnání vypíše i velikost
+původního promptu (syrové chunky v f-stringu).
+
+Bez tiktoken / tokenizeru o200k_base (stahuje se při prvním použití) se
+test přeskočí.
+
+Spuštění:
+    python test_prompt_size.py
+    python -m pytest test_prompt_size.py
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+
+def tokenizer_unavailable():
+    """Důvod přeskočení, pokud tokenizer nejde načíst (None = je k dispozici)."""
+    try:
+        from token_budget import get_encoding
+        get_encoding()
+    except Exception as e:
+        return f"tokenizer o200k_base není k dispozici ({type(e).__name__}: {e})"
+    return None
+
+
+SKIP_REASON = tokenizer_unavailable()
+if SKIP_REASON is not None:
+    if __name__ == "__main__":
+        print(f"⏭️  Test přeskočen - {SKIP_REASON}")
+        sys.exit(0)
+    import pytest
+    pytest.skip(SKIP_REASON, allow_module_level=True)
+
+from context_formatter import CONTEXT_MAX_TOKENS, SYSTEM_PROMPT, format_context, human_prompt
+from embedding_store import STORE_NAME, load_store, store_exists
+from token_budget import count_tokens
+
+
+# Konfigurace
+TOP_K = 6
+REQUESTS = 20
+SEED = 42
+MAX_PROMPT_TOKENS = 2700   # systémový prompt + otázka + CONTEXT_MAX_TOKENS s rezervou
+QUESTIONS = [
+    "Jaké oleje bys doporučil na psychickou únavu a stres?",
+    "Nespím dobře, co bys poradil? Jak bys sestavil recept na spaní?",
+    "Na co se používá máta peprná?",
+    "Chtěl bych něco na posílení imunity, co doporučíš?"
+]
+
+
+def sample_chunks():
+    """Chunky s embeddingy jako v chunked_data_with_embeddings.json (nebo ukázkové)."""
+    json_path = Path("chunked_data_with_embeddings.json")
+    if json_path.exists():
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)["chunks"]
+
+    if store_exists(STORE_NAME):
+        store = load_store(STORE_NAME)
+        return [dict(chunk, embedding=store.matrix[row].tolist()) for row, chunk in enumerate(store.chunks)]
+
+    # Ukázková data ve formátu z 2_chunking_strategy.py
+    rng = random.Random(SEED)
+    text = ("Levandule lékařská zklidňuje nervovou soustavu a pomáhá při nespavosti. "
+            "Používá se v difuzéru, do koupele nebo k masáži. ") * 12
+    return [
+        {
+            "id": f"book1_{i}_part_1",
+            "type": "herb_knowledge" if i % 2 else "essential_oil",
+            "entity_name": f"Bylina {i}",
+            "entity_type": "herb",
+            "text": text[:1200],
+            "part": 1,
+            "total_parts": 3,
+            "tier": "premium",
+            "metadata": {"source": "book1", "category": "bylinky", "chunk_size": 1200},
+            "embedding": [rng.uniform(-0.1, 0.1) for _ in range(384)]
+        }
+        for i in range(50)
+    ]
+
+
+def prompt_tokens(question, context):
+    return count_tokens(SYSTEM_PROMPT) + count_tokens(human_prompt(question, context))
+
+
+def requests():
+    """Náhodné požadavky - (otázka, TOP_K chunků), nejdelší chunky navíc."""
+    chunks = sample_chunks()
+    rng = random.Random(SEED)
+    longest = sorted(chunks, key=lambda chunk: len(chunk.get("text", "")), reverse=True)[:TOP_K]
+    yield QUESTIONS[0], longest
+    for i in range(REQUESTS - 1):
+        yield QUESTIONS[i % len(QUESTIONS)], rng.sample(chunks, min(TOP_K, len(chunks)))
+
+
+def test_prompt_token_count():
+    """Prompt každého požadavku je pod stropem a bez embeddingů."""
+    old_sizes, new_sizes = [], []
+    for question, docs in requests():
+        context = format_context(docs)
+        tokens = prompt_tokens(question, context)
+
+        assert count_tokens(context) <= CONTEXT_MAX_TOKENS, "Kontext překročil CONTEXT_MAX_TOKENS"
+        assert tokens <= MAX_PROMPT_TOKENS, f"Prompt má {tokens} tokenů (strop {MAX_PROMPT_TOKENS})"
+        assert "embedding" not in context and "chunk_size" not in context, "Do promptu prosakují metadata"
+
+        old_sizes.append(prompt_tokens(question, str(docs)))
+        new_sizes.append(tokens)
+
+    print(f"\n📏 Tokenů promptu na požadavek ({len(new_sizes)} požadavků):")
+    print(f"  • syrové chunky:    průměr {sum(old_sizes) / len(old_sizes):8.0f}, max {max(old_sizes)}")
+    print(f"  • kompaktní formát: průměr {sum(new_sizes) / len(new_sizes):8.0f}, max {max(new_sizes)}")
+
+
+def test_context_is_stable():
+    """Stejné chunky = stejný kontext (kvůli prompt cache a reprodukovatelnosti)."""
+    question, docs = next(requests())
+    assert format_context(docs) == format_context([dict(doc) for doc in docs])
+    assert format_context(docs).startswith("[1] ")
+
+
+if __name__ == "__main__":
+    print("="*70)
+    print("🧪 FLEURDIN AI - TEST VELIKOSTI PROMPTU")
+    print("="*70)
+
+    test_prompt_token_count()
+    test_context_is_stable()
+    print("\n✅ Všechny testy prošly")
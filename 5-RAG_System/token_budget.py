@@ -0,0 +1,31 @@
+"""
+FLEURDIN AI - TOKEN BUDGET
+==========================
+Počítání tokenů promptu stejným tokenizerem, jaký používá gpt-4o-mini
+(tiktoken, o200k_base), a ořez textu na limit tokenů.
+"""
+
+from functools import lru_cache
+
+import tiktoken
+
+
+TOKEN_ENCODING = "o200k_base"   # gpt-4o / gpt-4o-mini
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name=TOKEN_ENCODING):
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text):
+    """Počet tokenů textu."""
+    return len(get_encoding().encode(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Ořízne text na max_tokens tokenů (vrací text beze změny, pokud se vejde)."""
+    tokens = get_encoding().encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return get_encoding().decode(tokens[:max_tokens])
@@ -0,0 +1,160 @@
+"""
+FLEURDIN AI - TRIGRAM INDEX
+===========================
+Fuzzy hledání názvů olejů a bylin ("levanduli", "levandula", "pupava").
+
+Názvy entit a jejich aliasy (viz entity_matcher.entity_aliases) se rozloží
+na znakové trigramy bez diakritiky. Podobnost zmínky s aliasem je
+Jaccardův index množin trigramů - spočítá se pro všechny aliasy najednou
+z kompaktních postings (trigram → aliasy), bez dotazu do databáze
+(náhrada za ilike '%levandule%', který je full scan a skloňované tvary mine).
+
+Vrací kanonické názvy entit - stejné klíče jako EntityMatcher.entity_rows.
+"""
+
+import re
+
+import numpy as np
+
+from entity_matcher import MAX_ALIAS_WORDS, entity_aliases, fold_text
+
+
+MIN_HEAD_LENGTH = 4     # "Máta peprná" → i samotné "mata"
+MIN_WORD_LENGTH = 4     # Kratší slova otázky se samostatně nehledají
+MAX_QUERY_WORDS = 3     # Nejdelší hledaná skupina slov otázky
+
+
+def trigrams(text):
+    """Množina znakových trigramů (s mezerami na okrajích slov)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Trigramy aliasů v CSR postings + Jaccard podobnost"""
+
+    def __init__(self, aliases, alias_entities, trigram_ids, offsets, postings, sizes):
+        """
+        Parametry:
+        - aliases: normalizované aliasy (index = id aliasu)
+        - alias_entities: kanonická entita pro každý alias
+        - trigram_ids: {trigram: id}
+        - offsets, postings: CSR - aliasy obsahující trigram id
+        - sizes: počet trigramů každého aliasu
+        """
+        self.aliases = aliases
+        self.alias_entities = alias_entities
+        self.trigram_ids = trigram_ids
+        self.offsets = offsets
+        self.postings = postings
+        self.sizes = sizes
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        aliases, alias_entities = [], []
+        seen = set()
+
+        for chunk in chunks:
+            entity, names = entity_aliases(chunk)
+            if entity is None:
+                continue
+            for name in names:
+                folded = " ".join(re.findall(r"\w+", fold_text(name)))
+                candidates = [folded]
+                # České/slovenské názvy začínají rodovým jménem ("Púpava lekárska")
+                head = folded.split(" ")[0]
+                if head != folded and len(head) >= MIN_HEAD_LENGTH:
+                    candidates.append(head)
+                for alias in candidates:
+                    if alias and (alias, entity) not in seen:
+                        seen.add((alias, entity))
+                        aliases.append(alias)
+                        alias_entities.append(entity)
+
+        return cls.from_aliases(aliases, alias_entities)
+
+    @classmethod
+    def from_aliases(cls, aliases, alias_entities):
+        trigram_ids = {}
+        postings = []
+        sizes = np.empty(len(aliases), dtype=np.int32)
+
+        for alias_id, alias in enumerate(aliases):
+            grams = trigrams(alias)
+            sizes[alias_id] = len(grams)
+            for gram in grams:
+                if gram not in trigram_ids:
+                    trigram_ids[gram] = len(postings)
+                    postings.append([])
+                postings[trigram_ids[gram]].append(alias_id)
+
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in postings], out=offsets[1:])
+        flat = np.array([alias_id for ids in postings for alias_id in ids], dtype=np.int32)
+        return cls(aliases, alias_entities, trigram_ids, offsets, flat, sizes)
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def lookup(self, mention, threshold=0.5, limit=5):
+        """
+        Nejpodobnější entity pro zmínku (jedno nebo pár slov).
+        Vrací [(entita, alias, similarity)] seřazené od nejpodobnější,
+        každá entita nejvýš jednou.
+        """
+        grams = trigrams(" ".join(re.findall(r"\w+", fold_text(mention))))
+        known = [self.trigram_ids[gram] for gram in grams if gram in self.trigram_ids]
+        if not known:
+            return []
+
+        hits = np.concatenate([self.postings[self.offsets[t]:self.offsets[t + 1]] for t in known])
+        shared = np.bincount(hits, minlength=len(self.aliases))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(grams) + self.sizes[candidates] - shared[candidates])
+
+        keep = similarity >= threshold
+        candidates, similarity = candidates[keep], similarity[keep]
+
+        results = []
+        seen = set()
+        for i in np.argsort(-similarity, kind="stable"):
+            entity = self.alias_entities[candidates[i]]
+            if entity in seen:
+                continue
+            seen.add(entity)
+            results.append((entity, self.aliases[candidates[i]], float(similarity[i])))
+            if len(results) >= limit:
+                break
+        return results
+
+    def match(self, question, threshold=0.6):
+        """
+        Entity zmíněné v otázce i s překlepy a bez diakritiky.
+        Zkouší skupiny 1..MAX_QUERY_WORDS slov, nejpodobnější shody bez
+        překryvu vyhrávají. Vrací entity v pořadí výskytu.
+        """
+        words = re.findall(r"\w+", fold_text(question))
+        max_words = min(MAX_QUERY_WORDS, MAX_ALIAS_WORDS)
+
+        spans = []
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + max_words, len(words)) + 1):
+                if max(len(word) for word in words[start:end]) < MIN_WORD_LENGTH:
+                    continue
+                for entity, _, similarity in self.lookup(" ".join(words[start:end]), threshold):
+                    spans.append((similarity, start, end, entity))
+
+        spans.sort(key=lambda span: (-span[0], span[1]))
+        taken = {}      # (začátek, konec) -> nejlepší similarity úseku
+        found = {}
+        for similarity, start, end, entity in spans:
+            if any(start < t_end and t_start < end and (t_start, t_end) != (start, end)
+                   for t_start, t_end in taken):
+                continue
+            # Stejný úsek může patřit víc entitám (Máta peprná / Máta klasnatá),
+            # ale jen se stejně dobrou shodou
+            if taken.setdefault((start, end), similarity) > similarity:
+                continue
+            found.setdefault(entity, start)
+
+        return sorted(found, key=found.get)
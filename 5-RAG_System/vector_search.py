@@ -0,0 +1,213 @@
+"""
+FLEURDIN AI - VECTOR SEARCH
+===========================
+Maticové vyhledávání nad embeddingy chunků.
+
+Všechny embeddingy se načtou jednou do souvislé float32 matice
+s předem normalizovanými řádky, takže cosine similarity dotazu
+se všemi chunky je jeden maticově-vektorový součin.
+"""
+
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """
+    Vrátí float32 matici s řádky normalizovanými na délku 1.
+    Nulové řádky zůstanou nulové (similarity 0).
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def normalize_vector(vector):
+    """Vrátí float32 vektor normalizovaný na délku 1."""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+def top_k_indices(scores, k):
+    """
+    Vrátí indexy k nejvyšších skóre seřazené sestupně.
+    Místo plného třídění použije argpartition (O(n) + O(k log k)).
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def take_rows(rows, positions):
+    """
+    Převede pozice v podmnožině řádků na indexy řádků matice.
+    rows = slice, pole indexů, nebo None (celá matice).
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if rows is None:
+        return positions
+    if isinstance(rows, slice):
+        return positions + rows.start
+    return np.asarray(rows, dtype=np.int64)[positions]
+
+
+class VectorIndex:
+    """Přesné (brute-force) cosine vyhledávání nad maticí embeddingů"""
+
+    def __init__(self, matrix, normalized=False):
+        """
+        Parametry:
+        - matrix: (n, d) matice embeddingů (řádek = chunk)
+        - normalized: True, pokud jsou řádky už normalizované (bez kopie)
+        """
+        if normalized:
+            self.matrix = matrix
+        else:
+            self.matrix = normalize_rows(matrix)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Postaví index z chunků se seznamem 'embedding'."""
+        matrix = np.array([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+        return cls(matrix)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dimensions(self):
+        return self.matrix.shape[1]
+
+    def scores(self, query_embedding):
+        """Cosine similarity dotazu se všemi chunky (jeden mat-vec součin)."""
+        query = normalize_vector(query_embedding)
+        return self.matrix @ query
+
+    def search(self, query_embedding, top_k=5, rows=None):
+        """
+        Najde top_k nejpodobnějších chunků.
+
+        Parametry:
+        - rows: volitelně omezení na podmnožinu řádků - slice (pohled
+          do matice bez kopie) nebo pole indexů; skóruje se jen ta
+
+        Vrací (rows, scores) - indexy řádků a jejich similarity, sestupně.
+        """
+        if rows is None:
+            scores = self.scores(query_embedding)
+            best = top_k_indices(scores, top_k)
+            return best, scores[best]
+
+        scores = self.matrix[rows] @ normalize_vector(query_embedding)
+        best = top_k_indices(scores, top_k)
+        if isinstance(rows, slice):
+            return best + rows.start, scores[best]
+        return rows[best], scores[best]
+
+
+def partition_rows(chunks, key="type"):
+    """
+    Rozdělí řádky podle hodnoty klíče chunku ({hodnota: řádky}).
+    Souvislý rozsah se vrátí jako slice (pohled do matice bez kopie),
+    jinak jako pole indexů.
+    """
+    groups = {}
+    for row, chunk in enumerate(chunks):
+        groups.setdefault(chunk.get(key), []).append(row)
+
+    partitions = {}
+    for value, rows in groups.items():
+        if rows[-1] - rows[0] + 1 == len(rows):
+            partitions[value] = slice(rows[0], rows[-1] + 1)
+        else:
+            partitions[value] = np.array(rows, dtype=np.int64)
+    return partitions
+
+
+def merge_top_k(results, k):
+    """Spojí několik výsledků (rows, scores) a vrátí společných top k."""
+    if not results:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    rows = np.concatenate([r for r, _ in results])
+    scores = np.concatenate([s for _, s in results])
+    best = top_k_indices(scores, k)
+    return rows[best], scores[best]
+
+
+def mmr_select(query, candidates, top_k, lambda_=0.5, groups=None, quota=None, relevance=None):
+    """
+    Maximal marginal relevance - vybere relevantní, ale navzájem odlišné kandidáty.
+
+    Parametry:
+    - query: normalizovaný vektor dotazu (d,)
+    - candidates: normalizované řádky kandidátů (c, d)
+    - lambda_: váha relevance (1.0 = čisté pořadí podle similarity, 0.0 = jen rozmanitost)
+    - groups: volitelná skupina každého kandidátu (int pole délky c)
+    - quota: max. počet vybraných z každé skupiny (pole indexované skupinou)
+    - relevance: volitelná relevance kandidátů (c,) místo similarity s query,
+      např. normalizované RRF skóre z hybridního hledání (škála 0-1 jako cosine)
+
+    Similarity všech párů je jeden maticový součin, každý krok výběru
+    jen aktualizuje maximum podobnosti k už vybraným.
+    Vrací indexy kandidátů v pořadí výběru.
+    """
+    candidates = np.asarray(candidates, dtype=np.float32)
+    count = min(top_k, len(candidates))
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if relevance is None:
+        relevance = candidates @ query
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = candidates @ candidates.T
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    taken = np.zeros(len(quota), dtype=np.int64) if quota is not None else None
+
+    selected = []
+    for _ in range(count):
+        allowed = available if groups is None else available & (taken[groups] < quota[groups])
+        if not allowed.any():
+            break
+        scores = np.where(allowed, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        if groups is not None:
+            taken[groups[best]] += 1
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return np.array(selected, dtype=np.int64)
+
+
+def adaptive_cutoff(scores, min_k, max_k, min_gap=0.08):
+    """
+    Kolik nejlepších výsledků vzít podle rozložení skóre.
+
+    Skóre se seřadí sestupně a hledá se první mezera (rozdíl sousedních skóre)
+    alespoň min_gap - výsledky za ní jsou zřetelně horší (jasný vítěz → málo
+    výsledků, ale aspoň min_k). Bez takové mezery (ploché skóre) se vezme max_k.
+    """
+    ordered = np.sort(np.asarray(scores, dtype=np.float32))[::-1][:max_k]
+    if len(ordered) <= min_k:
+        return len(ordered)
+
+    gaps = ordered[:-1] - ordered[1:]     # gaps[i] = mezera za i+1 výsledky
+    big = np.flatnonzero(gaps >= min_gap)
+    return max(min_k, int(big[0]) + 1) if len(big) else len(ordered)
+
+
+def recall_at_k(approx_rows, exact_rows):
+    """Podíl přesných top-k výsledků, které našlo přibližné hledání."""
+    exact = set(np.asarray(exact_rows).tolist())
+    if not exact:
+        return 1.0
+    return len(exact & set(np.asarray(approx_rows).tolist())) / len(exact)
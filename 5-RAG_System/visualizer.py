@@ -1,20 +1,35 @@
-from IPython.display import Image, display
+import hashlib
+from pathlib import Path
+
+
+def graph_hash(graph):
+    """Hash struktury grafu (uzly + hrany z Mermaid textu, vykresluje se lokálně)."""
+    return hashlib.sha256(graph.get_graph().draw_mermaid().encode("utf-8")).hexdigest()
 
 def visualize(graph, output_path="graph.png"):
     """
     Visualizes a LangGraph graph and saves it to a PNG file.
+    The PNG is rendered (over the network) only when the graph structure changed -
+    the structure hash is stored next to the image.
 
     Args:
         graph: The compiled LangGraph graph
         output_path: Path where to save the PNG file (default: "graph.png")
     """
+    output_path = Path(output_path)
+    hash_path = output_path.with_name(output_path.name + ".sha256")
     try:
+        structure = graph_hash(graph)
+        if output_path.exists() and hash_path.exists() and hash_path.read_text().strip() == structure:
+            return
+
         # Generate the graph visualization
         png_data = graph.get_graph().draw_mermaid_png()
 
         # Save to file
         with open(output_path, "wb") as f:
             f.write(png_data)
+        hash_path.write_text(structure)
 
         print(f"✅ Graf uložen do {output_path}")
 